@@ -33,9 +33,9 @@ from pathlib import Path
 from typing import Optional
 
 import anthropic
-from openai import OpenAI
 
 from card_generator import CardGenerator
+from llm_gateway import get_client, guard
 from search import search_web, download_image, create_placeholder
 
 # ---------------------------------------------------------------------------
@@ -205,24 +205,18 @@ class Agent:
         self.history: list[dict] = []
 
         if self.backend == "claude":
-            self.client = anthropic.Anthropic(
-                api_key=os.environ.get("ANTHROPIC_API_KEY")
-            )
+            self.client = get_client("anthropic", os.environ.get("ANTHROPIC_API_KEY"))
             self.tools = _to_claude_tools()
 
         elif self.backend == "kimi":
-            self.client = OpenAI(
-                api_key=os.environ.get("MOONSHOT_API_KEY"),
-                base_url="https://api.moonshot.ai/v1",
-            )
+            self.client = get_client("moonshot", os.environ.get("MOONSHOT_API_KEY"))
             self.tools = _to_openai_tools()
             # OpenAI-style APIs need the system message inside the messages list
             self.history.append({"role": "system", "content": SYSTEM_PROMPT})
 
         elif self.backend == "gemini":
-            from google import genai
             from google.genai import types
-            self.client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+            self.client = get_client("gemini", os.environ.get("GEMINI_API_KEY"))
             self.tools  = _to_gemini_tools()
             self._gemini_config = types.GenerateContentConfig(
                 tools=self.tools,
@@ -264,14 +258,15 @@ class Agent:
 
     # ── Claude turn ────────────────────────────────────────────────────────
     def _turn_claude(self) -> Optional[str]:
-        response = self.client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=CLAUDE_MAX_TOK,
-            thinking={"type": "enabled", "budget_tokens": CLAUDE_THINK},
-            system=SYSTEM_PROMPT,
-            tools=self.tools,
-            messages=self.history,
-        )
+        with guard("anthropic"):
+            response = self.client.messages.create(
+                model=CLAUDE_MODEL,
+                max_tokens=CLAUDE_MAX_TOK,
+                thinking={"type": "enabled", "budget_tokens": CLAUDE_THINK},
+                system=SYSTEM_PROMPT,
+                tools=self.tools,
+                messages=self.history,
+            )
 
         # CRITICAL: store every block unchanged (thinking + tool_use + text)
         self.history.append({
@@ -300,13 +295,14 @@ class Agent:
 
     # ── Kimi / OpenAI turn ─────────────────────────────────────────────────
     def _turn_kimi(self) -> Optional[str]:
-        response = self.client.chat.completions.create(
-            model=KIMI_MODEL,
-            max_tokens=KIMI_MAX_TOK,
-            temperature=0.6,
-            tools=self.tools,
-            messages=self.history,
-        )
+        with guard("moonshot"):
+            response = self.client.chat.completions.create(
+                model=KIMI_MODEL,
+                max_tokens=KIMI_MAX_TOK,
+                temperature=0.6,
+                tools=self.tools,
+                messages=self.history,
+            )
 
         msg = response.choices[0].message
 
@@ -351,11 +347,12 @@ class Agent:
         else:
             self._gemini_contents.append(self.history[-1]["content"])
 
-        response = self.client.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=self._gemini_contents,
-            config=self._gemini_config,
-        )
+        with guard("gemini"):
+            response = self.client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=self._gemini_contents,
+                config=self._gemini_config,
+            )
 
         # store model response for next round
         self._gemini_contents.append(response.candidates[0].content)
@@ -28,15 +28,19 @@ async def setup_analytics(app):
 
     Registers API endpoints + starts background scheduling loops.
     """
+    from fastapi import Request
     from fastapi.responses import HTMLResponse, JSONResponse
     from analytics.dashboard import ANALYTICS_HTML
+    from http_cache import PrecompressedPage
 
     # -----------------------------------------------------------------------
-    # Dashboard UI
+    # Dashboard UI  (gzip/br-encoded once, served with ETag + 304)
     # -----------------------------------------------------------------------
+    analytics_page = PrecompressedPage(ANALYTICS_HTML, label="analytics")
+
     @app.get("/analytics", response_class=HTMLResponse)
-    async def analytics_dashboard():
-        return ANALYTICS_HTML
+    async def analytics_dashboard(request: Request):
+        return analytics_page.response(request)
 
     # -----------------------------------------------------------------------
     # API endpoints
@@ -8,9 +8,9 @@ Adds: rate limiting (500ms), retry with exponential backoff, local caching.
 
 import os
 import time
-import requests as _requests
 from datetime import datetime, timedelta, timezone
 
+from metrics import timed_request
 from analytics.fb_cache import save_api_cache, load_api_cache
 
 # Reuse existing FB credentials (same env vars as facebook.py)
@@ -51,7 +51,8 @@ def _api_get(endpoint: str, params: dict, cache_key: str = None,
     for attempt in range(_MAX_RETRIES):
         try:
             _rate_limit()
-            resp = _requests.get(
+            resp = timed_request(
+                "graph", "GET",
                 f"{GRAPH_URL}/{endpoint}",
                 params={"access_token": PAGE_TOKEN, **params},
                 timeout=15,
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+URL-keyed cache of extracted article bodies with conditional revalidation.
+
+One article is fetched for speculation, again on approval, again for
+dedupe — each time a full page download + parse.  ArticleCache keeps the
+extracted main text (not the HTML) per canonical URL: within `fresh_s` it is
+served as-is; after that the page is revalidated with If-None-Match /
+If-Modified-Since and a 304 just renews the entry.  If revalidation fails
+the stale text is served rather than nothing.  Bounded LRU, thread-safe.
+
+Usage:
+    from article_cache import ArticleCache
+    articles = ArticleCache(verify=False)      # interpressnews has cert issues
+    text = articles.text(url)                  # "" if it could never be fetched
+    articles.stats()                           # {hits, revalidated, fetched, errors, stale_served, entries}
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from news_parser import extract_main_text
+from seen_store import canonical_url
+
+
+class ArticleCache:
+    """Extracted article text per URL: fresh → served, stale → conditional GET."""
+
+    def __init__(self, max_entries: int = 300, fresh_s: float = 900, timeout: float = 15,
+                 verify: bool = True, extract: Callable[[str], str] = extract_main_text):
+        self.max_entries = max_entries
+        self.fresh_s = fresh_s
+        self.timeout = timeout
+        self.verify = verify
+        self.extract = extract
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._stats = {"hits": 0, "revalidated": 0, "fetched": 0, "errors": 0, "stale_served": 0}
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        self.session.headers["User-Agent"] = "Mozilla/5.0"
+
+    def _count(self, field: str):
+        with self._lock:
+            self._stats[field] += 1
+
+    def text(self, url: str) -> str:
+        key = canonical_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and time.time() - entry["checked"] < self.fresh_s:
+            self._count("hits")
+            return entry["text"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            resp = self.session.get(url, headers=headers, timeout=self.timeout, verify=self.verify)
+            if resp.status_code == 304 and entry is not None:
+                entry["checked"] = time.time()
+                self._count("revalidated")
+                return entry["text"]
+            resp.raise_for_status()
+            resp.encoding = "utf-8"
+            text = self.extract(resp.text)
+        except Exception as exc:
+            print(f"[Articles] Fetch failed for {url[:80]}: {exc}")
+            self._count("errors")
+            if entry is not None:
+                self._count("stale_served")
+                return entry["text"]
+            return ""
+
+        self._count("fetched")
+        with self._lock:
+            self._entries[key] = {"text": text, "checked": time.time(),
+                                  "etag": resp.headers.get("ETag"),
+                                  "last_modified": resp.headers.get("Last-Modified")}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fresh SDK client per call vs. the shared llm_gateway client.
+
+Starts a local OpenAI-compatible mock server (POST /v1/chat/completions) and
+makes N sequential calls each way, reporting per-call latency, client setup
+time and how many TCP connections the server had to accept.  Uses the openai
+SDK when installed, otherwise the same pooled httpx client the gateway hands
+to the SDKs.  Loopback has no TLS, so real-world savings are larger — every
+avoided connection there is also an avoided TLS handshake (~1-2 RTTs).
+
+Usage:
+    python benchmarks/bench_llm_clients.py [calls]
+"""
+
+import importlib.util
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import llm_gateway  # noqa: E402
+
+HAVE_OPENAI = importlib.util.find_spec("openai") is not None
+
+_REPLY = json.dumps({
+    "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "mock",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": '{"name":"ok"}'}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"           # keep-alive
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _MockHandler.lock:
+            _MockHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(_REPLY)))
+        self.end_headers()
+        self.wfile.write(_REPLY)
+
+    def log_message(self, *args):
+        pass
+
+
+def _make_caller(base_url: str, shared: bool):
+    """Return (call(), setup_seconds_list). SDK path when openai is importable."""
+    setup = []
+    sdk = HAVE_OPENAI
+
+    def build():
+        t0 = time.perf_counter()
+        if sdk:
+            client = (llm_gateway.get_client("openai", "bench", base_url=base_url) if shared
+                      else llm_gateway._build_client("openai", "bench", base_url))
+        else:
+            client = llm_gateway.http_client()
+        setup.append(time.perf_counter() - t0)
+        return client
+
+    shared_client = build() if shared else None
+
+    def call():
+        client = shared_client or build()
+        try:
+            if sdk:
+                client.chat.completions.create(model="mock", messages=[{"role": "user", "content": "hi"}])
+            else:
+                client.post(f"{base_url}/chat/completions",
+                            json={"model": "mock", "messages": [{"role": "user", "content": "hi"}]}
+                            ).raise_for_status()
+        finally:
+            if shared_client is None:
+                client.close()
+
+    return call, setup, sdk
+
+
+def run(calls: int = 200) -> dict:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    results = {}
+    try:
+        for mode in ("fresh", "shared"):
+            _MockHandler.connections = 0
+            call, setup, sdk = _make_caller(base_url, shared=(mode == "shared"))
+            call()                                   # warm-up (imports, first connect)
+            _MockHandler.connections = 0
+            samples = []
+            t_all = time.perf_counter()
+            for _ in range(calls):
+                t0 = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - t0)
+            total = time.perf_counter() - t_all
+            results[mode] = {
+                "client": "openai SDK" if sdk else "httpx",
+                "calls": calls,
+                "total_s": round(total, 3),
+                "mean_ms": round(statistics.mean(samples) * 1000, 3),
+                "p50_ms": round(statistics.median(samples) * 1000, 3),
+                "setup_ms": round(statistics.mean(setup) * 1000, 3),
+                "connections": _MockHandler.connections,
+            }
+    finally:
+        server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    res = run(n)
+    for mode, r in res.items():
+        print(f"{mode:>6}: {r['mean_ms']:8.3f} ms/call  p50 {r['p50_ms']:7.3f} ms  "
+              f"setup {r['setup_ms']:7.3f} ms  connections {r['connections']:4d}  ({r['client']})")
+    fresh, shared = res["fresh"], res["shared"]
+    print(f"speed-up ×{fresh['mean_ms'] / shared['mean_ms']:.2f}, "
+          f"{fresh['connections'] - shared['connections']} connections avoided over {n} calls")
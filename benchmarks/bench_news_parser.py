@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: interpressnews page parsing — old BeautifulSoup extraction vs news_parser.
+
+Runs each extractor over every saved page in benchmarks/fixtures/
+(ipn_category*.html, ipn_article*.html) and reports best-of-N parse time and
+peak traced memory.  ipn_category.html / ipn_article.html are hand-built
+stand-ins (40 Article teasers; an article with the site's navigation, script
+and footer weight); `--save` captures the live category page and its first
+few articles next to them, dated, so real markup can be checked in.
+
+Article pages are measured with both news_parser extractors: the <p> sweep
+(parse_article_text, what the "before" code did) and the main-content block
+(extract_main_text, what ArticleCache serves).  The "before" rows need
+beautifulsoup4 (and use lxml for the strainer variant when it is installed);
+without it only news_parser is measured.  Rows marked * are checked for
+identical output.
+
+Usage:
+    python benchmarks/bench_news_parser.py [repeats]
+    python benchmarks/bench_news_parser.py --save [n_articles]
+"""
+
+import importlib.util
+import sys
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import news_parser  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+CATEGORY_URL = "https://interpressnews.ge/ka/category/5-politika/"
+HAVE_BS4 = importlib.util.find_spec("bs4") is not None
+BS4_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+# -- the previous implementation (web_app._scrape_interpressnews / _scrape_article_text)
+def bs4_category(html: str) -> list[dict]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    articles = []
+    for item in soup.find_all("div", itemscope=True, itemtype="http://schema.org/Article"):
+        a_tag = item.find("a", itemprop="url")
+        h2_tag = item.find("h2", itemprop="name")
+        img_tag = item.find("img", itemprop="image")
+        time_tag = item.find("time")
+        if not a_tag or not h2_tag:
+            continue
+        href = a_tag.get("href", "")
+        if href and not href.startswith("http"):
+            href = "https://interpressnews.ge" + href
+        image_url = None
+        if img_tag:
+            image_url = img_tag.get("data-src") or img_tag.get("src")
+        articles.append({
+            "title": h2_tag.get_text(strip=True),
+            "url": href,
+            "image_url": image_url,
+            "time": time_tag.get("datetime", "") if time_tag else "",
+        })
+    return articles
+
+
+def bs4_article(html: str) -> str:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = soup.find_all("p")
+    texts = [p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 20]
+    return "\n".join(texts)
+
+
+# -- a strainer-restricted BeautifulSoup, for comparison
+def strainer_article(html: str) -> str:
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html, BS4_PARSER, parse_only=SoupStrainer("p"))
+    texts = (p.get_text(strip=True) for p in soup.find_all("p"))
+    return "\n".join(t for t in texts if len(t) > 20)
+
+
+def _measure(fn, html: str, repeats: int) -> dict:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    result = fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(best * 1000, 2), "peak_kb": round(peak / 1024), "result": result}
+
+
+def _extractors(kind: str) -> list[tuple[str, object, bool]]:
+    """(row name, extractor, compared for identical output) for a page kind."""
+    if kind == "category":
+        rows = [("news_parser.parse_category", news_parser.parse_category, True)]
+        if HAVE_BS4:
+            rows.insert(0, ("bs4 html.parser (before)", bs4_category, True))
+        return rows
+    rows = [("news_parser.parse_article_text", news_parser.parse_article_text, True),
+            ("news_parser.extract_main_text", news_parser.extract_main_text, False)]
+    if HAVE_BS4:
+        rows[:0] = [("bs4 html.parser (before)", bs4_article, True),
+                    (f"bs4 SoupStrainer({BS4_PARSER})", strainer_article, True)]
+    return rows
+
+
+def run(repeats: int = 20) -> dict:
+    if not HAVE_BS4:
+        print("beautifulsoup4 not installed — measuring news_parser only")
+    results = {}
+    for kind in ("category", "article"):
+        for path in sorted(FIXTURES.glob(f"ipn_{kind}*.html")):
+            html = path.read_text(encoding="utf-8")
+            rows = {name: {**_measure(fn, html, repeats), "compared": compared}
+                    for name, fn, compared in _extractors(kind)}
+            outputs = [r["result"] for r in rows.values() if r["compared"]]
+            results[path.name] = {"bytes": len(html.encode()), "rows": rows,
+                                  "same_output": all(o == outputs[0] for o in outputs)}
+    return results
+
+
+def save(n_articles: int = 3) -> list[Path]:
+    """Capture the live category page and its first *n_articles* articles into FIXTURES."""
+    import requests
+    import urllib3
+    urllib3.disable_warnings()                # the site's certificate chain is incomplete
+
+    def fetch(url: str) -> str:
+        resp = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, verify=False, timeout=15)
+        resp.raise_for_status()
+        resp.encoding = "utf-8"
+        return resp.text
+
+    stamp = date.today().isoformat()
+    category = fetch(CATEGORY_URL)
+    pages = {f"ipn_category-{stamp}.html": category}
+    for i, art in enumerate(news_parser.parse_category(category)[:n_articles], 1):
+        pages[f"ipn_article-{stamp}-{i}.html"] = fetch(art["url"])
+    saved = []
+    for name, html in pages.items():
+        (FIXTURES / name).write_text(html, encoding="utf-8")
+        saved.append(FIXTURES / name)
+    return saved
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--save"]:
+        for path in save(int(sys.argv[2]) if len(sys.argv) > 2 else 3):
+            print(f"saved {path.relative_to(FIXTURES.parent.parent)} ({path.stat().st_size // 1024} KB)")
+        sys.exit(0)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for name, page in run(n).items():
+        print(f"{name} ({page['bytes'] // 1024} KB), identical output*: {page['same_output']}")
+        for row, r in page["rows"].items():
+            mark = "*" if r["compared"] else " "
+            print(f"  {row + mark:<32} {r['ms']:8.2f} ms   peak {r['peak_kb']:6d} KB")
@@ -22,6 +22,10 @@ import base64
 from pathlib import Path
 from typing import Optional
 
+from metrics import histogram
+
+CARD_RENDER = histogram("card_render_seconds", "Card render time", ["engine"])
+
 # ---------------------------------------------------------------------------
 # CARD SIZE (pixels)
 # ---------------------------------------------------------------------------
@@ -299,6 +303,7 @@ class CardGenerator:
         """Generate card from image URL → save as JPEG → return path."""
         return self._render(image_url, name, text, output_path)
 
+    @CARD_RENDER.timed(engine="playwright")
     def _render(
         self,
         image_data: str,
@@ -379,6 +384,7 @@ def generate_card_from_url_sync(
 # ---------------------------------------------------------------------------
 # Pillow-based Auto Card Generator (for auto-generate, no HTML template)
 # ---------------------------------------------------------------------------
+@CARD_RENDER.timed(engine="pillow")
 def generate_auto_card(
     photo_path: str,
     name: str,
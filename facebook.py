@@ -7,7 +7,8 @@ Env vars (set in Railway Variables tab):
 """
 
 import os
-import requests
+
+from metrics import timed_request
 
 PAGE_ID    = os.environ.get("FB_PAGE_ID")
 PAGE_TOKEN = os.environ.get("FB_PAGE_TOKEN")
@@ -29,7 +30,8 @@ def post_photo_ext(image_path: str, caption: str = "") -> dict:
 
     try:
         with open(image_path, "rb") as f:
-            resp = requests.post(
+            resp = timed_request(
+                "graph", "POST",
                 f"{GRAPH_URL}/{PAGE_ID}/photos",
                 data={
                     "access_token": PAGE_TOKEN,
@@ -86,7 +88,8 @@ def get_post_insights(post_id: str) -> dict:
     for fb_id in ids_to_try:
         # Try full Post fields first
         try:
-            resp = requests.get(
+            resp = timed_request(
+                "graph", "GET",
                 f"{GRAPH_URL}/{fb_id}",
                 params={"access_token": PAGE_TOKEN, "fields": POST_FIELDS},
                 timeout=15,
@@ -94,7 +97,8 @@ def get_post_insights(post_id: str) -> dict:
             if resp.status_code == 400 and "nonexisting field" in resp.text:
                 # Photo node — try bare fields
                 print(f"[FB] {fb_id} is a Photo node, retrying with basic fields")
-                resp = requests.get(
+                resp = timed_request(
+                    "graph", "GET",
                     f"{GRAPH_URL}/{fb_id}",
                     params={"access_token": PAGE_TOKEN, "fields": PHOTO_FIELDS},
                     timeout=15,
@@ -126,7 +130,8 @@ def get_page_stats() -> dict:
     if not PAGE_ID or not PAGE_TOKEN:
         return {"followers": 0, "fans": 0, "name": ""}
     try:
-        resp = requests.get(
+        resp = timed_request(
+            "graph", "GET",
             f"{GRAPH_URL}/{PAGE_ID}",
             params={
                 "access_token": PAGE_TOKEN,
@@ -151,7 +156,8 @@ def get_page_insights() -> dict:
     if not PAGE_ID or not PAGE_TOKEN:
         return {}
     try:
-        resp = requests.get(
+        resp = timed_request(
+            "graph", "GET",
             f"{GRAPH_URL}/{PAGE_ID}/insights",
             params={
                 "access_token": PAGE_TOKEN,
@@ -184,7 +190,8 @@ def get_post_reach(post_id: str) -> dict:
 
     for fb_id in ids_to_try:
         try:
-            resp = requests.get(
+            resp = timed_request(
+                "graph", "GET",
                 f"{GRAPH_URL}/{fb_id}/insights",
                 params={
                     "access_token": PAGE_TOKEN,
@@ -216,7 +223,8 @@ def get_page_growth() -> dict:
     if not PAGE_ID or not PAGE_TOKEN:
         return {"fan_adds": 0, "fan_removes": 0}
     try:
-        resp = requests.get(
+        resp = timed_request(
+            "graph", "GET",
             f"{GRAPH_URL}/{PAGE_ID}/insights",
             params={
                 "access_token": PAGE_TOKEN,
@@ -246,7 +254,8 @@ def get_page_views() -> dict:
     if not PAGE_ID or not PAGE_TOKEN:
         return {"page_views": 0}
     try:
-        resp = requests.get(
+        resp = timed_request(
+            "graph", "GET",
             f"{GRAPH_URL}/{PAGE_ID}/insights",
             params={
                 "access_token": PAGE_TOKEN,
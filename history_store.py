@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Durable card history — bounded ring buffer in SQLite (data/history.db).
+
+Rows are append-only with a monotonically increasing id, which doubles as the
+time index and the pagination cursor: a page is one `id < cursor` range scan on
+the primary key, so every page costs the same no matter how far back it is.
+Once more than `capacity` rows exist the oldest ones are trimmed in the same
+transaction.  WAL mode + busy timeout make the file safe to share between
+several uvicorn workers.
+
+Usage:
+    from history_store import HistoryStore
+    history = HistoryStore()
+    history.add("Name", "/cards/abc_card.jpg")
+    history.page(limit=20)                  # newest first
+    history.page(before=123, limit=20)      # next page (ids < 123)
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+DATA_DIR = Path(__file__).parent / "data"
+DB_FILE  = DATA_DIR / "history.db"
+
+
+class HistoryStore:
+    """Persistent, capacity-bounded, cursor-paginated card history."""
+
+    def __init__(self, path: Path = DB_FILE, capacity: int = 5000):
+        self.path = Path(path)
+        self.capacity = capacity
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " ts REAL NOT NULL,"
+                " name TEXT NOT NULL,"
+                " card_url TEXT NOT NULL,"
+                " time TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS history_ts ON history(ts)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 objects aren't shareable across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def add(self, name: str, card_url: str) -> dict:
+        """Append an entry; trims the oldest rows beyond capacity."""
+        now = time.time()
+        entry = {
+            "name":     name,
+            "card_url": card_url,
+            "time":     datetime.now().strftime("%H:%M  %d/%m"),
+        }
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            cur = db.execute(
+                "INSERT INTO history (ts, name, card_url, time) VALUES (?, ?, ?, ?)",
+                (now, entry["name"], entry["card_url"], entry["time"]),
+            )
+            entry_id = cur.lastrowid
+            db.execute("DELETE FROM history WHERE id <= ?", (entry_id - self.capacity,))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return {"id": entry_id, "ts": now, **entry}
+
+    def page(self, before: Optional[int] = None, limit: int = 20) -> list[dict]:
+        """Newest-first page of entries with id < *before* (or the latest when None)."""
+        limit = max(1, min(int(limit), 200))
+        if before is None:
+            rows = self._conn().execute(
+                "SELECT * FROM history ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM history WHERE id < ? ORDER BY id DESC LIMIT ?", (int(before), limit)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def clear(self):
+        self._conn().execute("DELETE FROM history")
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def __iter__(self):
+        rows = self._conn().execute("SELECT * FROM history ORDER BY id DESC").fetchall()
+        return iter([dict(r) for r in rows])
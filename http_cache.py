@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+HTTP caching for the static mounts (/cards, /photos, /voices) and the
+inline HTML pages (/ and /analytics).
+
+Generated artifacts (cards, voice WAVs) get unique uuid file names and are
+never rewritten, so they are served `immutable` for a year.  Library photos
+can be deleted and a new file uploaded under the same name, so they are served
+`no-cache` with a strong content-hash ETag — browsers and the Telegram/FB
+fetchers revalidate and get a cheap 304.  The hash is computed in a worker thread and
+memoised per (path, mtime, size).  Range requests (voices) are handled
+by Starlette's FileResponse.
+
+The big inline dashboards are compressed once (gzip + brotli when available)
+and served by content negotiation with a strong ETag per encoding.
+
+Usage (in web_app.py):
+    from http_cache import CachedStaticFiles, PrecompressedPage, IMMUTABLE, REVALIDATE
+    app.mount("/cards", CachedStaticFiles(directory="cards", cache_control=IMMUTABLE), name="cards")
+
+    page = PrecompressedPage(DASHBOARD)
+    @app.get("/")
+    async def dashboard(request: Request):
+        return page.response(request)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import stat
+import threading
+from collections import OrderedDict
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from janitor import record_access
+
+try:
+    import brotli
+except ImportError:          # optional — gzip-only without it
+    brotli = None
+
+IMMUTABLE  = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+_ETAG_CACHE_SIZE = 4096
+
+_lock = threading.Lock()
+_stats: dict[str, dict] = {}                       # mount → {hits, misses, partial}
+_etags: OrderedDict[tuple, str] = OrderedDict()    # (path, mtime_ns, size) → sha256
+
+
+def cache_stats() -> dict:
+    """Per-mount counters: hits = 304s, misses = full 200s, partial = 206 ranges."""
+    with _lock:
+        out = {}
+        for mount, s in _stats.items():
+            served = s["hits"] + s["misses"] + s["partial"]
+            out[mount] = {**s, "hit_rate": round(s["hits"] / served, 3) if served else 0.0}
+        return out
+
+
+def _count(mount: str, key: str):
+    with _lock:
+        s = _stats.setdefault(mount, {"hits": 0, "misses": 0, "partial": 0})
+        s[key] += 1
+
+
+def content_etag(path: str, stat_result: os.stat_result) -> str:
+    """Strong ETag from the file's SHA-256, memoised on (path, mtime, size)."""
+    key = (str(path), stat_result.st_mtime_ns, stat_result.st_size)
+    with _lock:
+        tag = _etags.get(key)
+        if tag:
+            _etags.move_to_end(key)
+            return tag
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    tag = f'"{h.hexdigest()[:32]}"'
+
+    with _lock:
+        _etags[key] = tag
+        while len(_etags) > _ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return tag
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with a Cache-Control policy, optional strong ETags and hit/miss counters."""
+
+    def __init__(self, *, directory, cache_control: str = REVALIDATE,
+                 strong_etag: bool = False, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.cache_control = cache_control
+        self.strong_etag = strong_etag
+        self.label = os.path.basename(os.path.normpath(str(directory)))
+
+    async def get_response(self, path: str, scope) -> Response:
+        # Hash off the event loop first, so file_response() hits the ETag memo
+        if self.strong_etag:
+            await asyncio.to_thread(self._warm_etag, path)
+        return await super().get_response(path, scope)
+
+    def _warm_etag(self, path: str):
+        try:
+            full_path, stat_result = self.lookup_path(path)
+        except (OSError, ValueError):
+            return                                  # super().get_response() reports it
+        if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+            content_etag(full_path, stat_result)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        record_access(full_path)
+
+        headers = {"cache-control": self.cache_control}
+        if self.strong_etag:
+            headers["etag"] = content_etag(full_path, stat_result)
+
+        response = FileResponse(full_path, status_code=status_code,
+                                headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            _count(self.label, "hits")
+            return NotModifiedResponse(response.headers)
+
+        _count(self.label, "partial" if "range" in request_headers else "misses")
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Precompressed HTML pages
+# ---------------------------------------------------------------------------
+def _accepted_encodings(header: str) -> dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class PrecompressedPage:
+    """An HTML string encoded once as identity / gzip / br, each with a strong ETag."""
+
+    # preference order when the client accepts several codings equally
+    _PREFERENCE = ("br", "gzip", "identity")
+
+    def __init__(self, html: str, label: str = "page",
+                 media_type: str = "text/html; charset=utf-8"):
+        self.label = label
+        self.media_type = media_type
+        raw = html.encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+
+        self.bodies = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(raw, quality=11, mode=brotli.MODE_TEXT)
+        self.etags = {enc: f'"{digest}-{enc}"' if enc != "identity" else f'"{digest}"'
+                      for enc in self.bodies}
+
+    def sizes(self) -> dict[str, int]:
+        return {enc: len(body) for enc, body in self.bodies.items()}
+
+    def _negotiate(self, accept_encoding: str) -> str:
+        """Highest-q coding we have; ties go to the smaller body (br > gzip > identity)."""
+        accepted = _accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*")
+        best, best_q = "identity", -1.0
+        for enc in self._PREFERENCE:
+            if enc not in self.bodies:
+                continue
+            default = 1.0 if enc == "identity" else (wildcard or 0.0)
+            q = accepted.get(enc, default)
+            if q > best_q:
+                best, best_q = enc, q
+        return best
+
+    def response(self, request: Request) -> Response:
+        enc = self._negotiate(request.headers.get("accept-encoding", ""))
+        headers = {
+            "etag": self.etags[enc],
+            "cache-control": "no-cache",
+            "vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if self.etags[enc] in tags or "*" in tags:
+            _count(self.label, "hits")
+            return Response(status_code=304, headers=headers)
+
+        _count(self.label, "misses")
+        if enc != "identity":
+            headers["content-encoding"] = enc
+        return Response(self.bodies[enc], media_type=self.media_type, headers=headers)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Storage janitor — keeps cards/, voices/, uploads/, temp/, temp/img_cache/ and
+temp/speculative/ within quotas.
+
+Each directory has a byte quota and a max age.  A sweep first deletes files
+that haven't been used for longer than max age, then, if the directory is
+still over its byte quota, evicts least-recently-used files until it fits.
+"Used" is the latest of the file's mtime and the last time it was served
+(static mounts call record_access()).  Files in the protected set — cards
+referenced by the activity log or history, speculative cards still held for
+approval — are never deleted.
+
+Subdirectories are not swept with their parent — each is configured on its own.
+
+Quotas (env, per directory NAME = CARDS / VOICES / UPLOADS / TEMP / IMG_CACHE / SPECULATIVE):
+    JANITOR_<NAME>_MB     — byte quota in MB
+    JANITOR_<NAME>_DAYS   — max age in days
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+_DEFAULT_QUOTAS = {            # dir → (MB, days)
+    "cards":   (1024, 60),
+    "voices":  (300, 14),
+    "uploads": (200, 3),
+    "temp":    (300, 2),
+    "img_cache": (150, 1),
+    "speculative": (200, 1),
+}
+
+_lock = threading.Lock()
+_access: dict[str, float] = {}         # resolved path → last served (epoch s)
+_stats: dict[str, dict] = {}           # dir → {reclaimed_bytes, reclaimed_files, bytes, files}
+_last_run: dict = {"at": None, "seconds": None}
+
+
+def quotas() -> dict[str, dict]:
+    """Effective quotas, env overrides applied."""
+    out = {}
+    for name, (mb, days) in _DEFAULT_QUOTAS.items():
+        key = name.upper()
+        out[name] = {
+            "max_bytes": int(float(os.environ.get(f"JANITOR_{key}_MB", mb)) * 1024 * 1024),
+            "max_age": float(os.environ.get(f"JANITOR_{key}_DAYS", days)) * 86400,
+        }
+    return out
+
+
+def record_access(path) -> None:
+    """Note that *path* was just served — keeps it warm for LRU eviction."""
+    key = os.path.realpath(path)
+    with _lock:
+        _access[key] = time.time()
+
+
+def _last_used(path: str, st: os.stat_result) -> float:
+    with _lock:
+        return max(st.st_mtime, _access.get(path, 0.0))
+
+
+def sweep_dir(directory: Path, max_bytes: int, max_age: float, protected: set[str]) -> dict:
+    """Apply age + byte quota to one directory. Returns {reclaimed_bytes, reclaimed_files, ...}."""
+    now = time.time()
+    files = []
+    if directory.exists():
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False) or entry.name.startswith("."):
+                    continue
+                path = os.path.realpath(entry.path)
+                st = entry.stat()
+                files.append((_last_used(path, st), st.st_size, path))
+
+    files.sort()                                  # least recently used first
+    total = sum(size for _, size, _ in files)
+    reclaimed_bytes = reclaimed_files = 0
+
+    for used, size, path in files:
+        if path in protected:
+            continue
+        expired = now - used > max_age
+        if not expired and total <= max_bytes:
+            continue
+        try:
+            os.remove(path)
+        except OSError as exc:
+            print(f"[Janitor] Could not delete {path}: {exc}")
+            continue
+        with _lock:
+            _access.pop(path, None)
+        total -= size
+        reclaimed_bytes += size
+        reclaimed_files += 1
+
+    return {"reclaimed_bytes": reclaimed_bytes, "reclaimed_files": reclaimed_files,
+            "bytes": total, "files": len(files) - reclaimed_files}
+
+
+def sweep(directories: dict[str, Path], protected: set[str]) -> dict:
+    """Sweep every configured directory (blocking — run in a thread)."""
+    t0 = time.perf_counter()
+    protected = {os.path.realpath(p) for p in protected}
+    limits = quotas()
+    result = {}
+    for name, directory in directories.items():
+        q = limits.get(name)
+        if q is None:
+            continue
+        res = sweep_dir(Path(directory), q["max_bytes"], q["max_age"], protected)
+        result[name] = res
+        with _lock:
+            s = _stats.setdefault(name, {"reclaimed_bytes": 0, "reclaimed_files": 0})
+            s["reclaimed_bytes"] += res["reclaimed_bytes"]
+            s["reclaimed_files"] += res["reclaimed_files"]
+            s["bytes"] = res["bytes"]
+            s["files"] = res["files"]
+        if res["reclaimed_files"]:
+            print(f"[Janitor] {name}/: −{res['reclaimed_files']} files, "
+                  f"−{res['reclaimed_bytes'] / 1048576:.1f} MB (now {res['bytes'] / 1048576:.1f} MB)")
+    with _lock:
+        for path in [p for p in _access if not os.path.exists(p)]:
+            del _access[path]
+        _last_run["at"] = time.time()
+        _last_run["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def janitor_stats() -> dict:
+    """Totals since process start + current usage per directory, for /api/status."""
+    with _lock:
+        return {
+            "dirs": {name: dict(s) for name, s in _stats.items()},
+            "reclaimed_bytes": sum(s["reclaimed_bytes"] for s in _stats.values()),
+            "last_run": dict(_last_run),
+        }
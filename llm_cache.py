@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Persistent LLM response cache — SQLite (data/llm_cache.db), TTL + LRU.
+
+Entries are keyed on sha256(provider, model, normalized prompt), so the same
+translation / caption / story pick over identical inputs is answered from disk
+instead of a 2-20 s model round-trip.  Each entry keeps the latency of the
+call that produced it; a hit adds that to `saved_s`.  Rows past their TTL are
+ignored and purged; beyond max_entries / max_bytes the least recently used
+rows are evicted.  Failed calls are never cached.
+
+Usage:
+    from llm_cache import LLMCache
+    llm_cache = LLMCache()
+    raw = llm_cache.completion("gemini", "gemini-2.0-flash", prompt,
+                               lambda: client.models.generate_content(...).text,
+                               ttl=7 * 86400, fn="translate")
+    llm_cache.stats()      # {hits, misses, hit_rate, saved_s, entries, bytes, by_fn}
+
+    result, cached = served_from_cache(lambda: _pick_gemini(res))   # cached: no model call ran
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Optional
+
+from metrics import counter
+
+DATA_DIR = Path(__file__).parent / "data"
+DB_FILE  = DATA_DIR / "llm_cache.db"
+
+CACHE_HITS   = counter("llm_cache_hits", "LLM responses served from cache", ["fn"])
+CACHE_MISSES = counter("llm_cache_misses", "LLM calls not in cache", ["fn"])
+CACHE_SAVED  = counter("llm_cache_saved_seconds", "Model latency avoided by cache hits", ["fn"])
+
+_WS = re.compile(r"\s+")
+
+# None until a completion runs in this context; True while every completion was a hit
+_all_hits: ContextVar[Optional[bool]] = ContextVar("llm_cache_all_hits", default=None)
+
+
+def served_from_cache(fn: Callable):
+    """Run *fn*; return (result, cached) — cached is True only if it made completions
+    and every one of them was answered from the cache (so no model latency was paid)."""
+    token = _all_hits.set(None)
+    try:
+        return fn(), _all_hits.get() is True
+    finally:
+        _all_hits.reset(token)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so cosmetic differences don't miss the cache."""
+    return _WS.sub(" ", prompt).strip()
+
+
+def cache_key(provider: str, model: str, prompt: str) -> str:
+    raw = f"{provider}\x00{model}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Thread-safe, multi-process-safe (WAL) TTL + LRU cache of raw model outputs."""
+
+    def __init__(self, path: Path = DB_FILE, max_entries: int = 5000,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}      # fn → {hits, misses, saved_s}
+        self._puts = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " provider TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " latency REAL NOT NULL,"
+            " expires REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache(last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, fn: str, field: str, amount: float = 1):
+        with self._lock:
+            s = self._stats.setdefault(fn, {"hits": 0, "misses": 0, "saved_s": 0.0})
+            s[field] += amount
+
+    # -- raw access ------------------------------------------------------------
+    def get(self, key: str) -> Optional[tuple[str, float]]:
+        """(value, latency of the original call) or None if missing / expired."""
+        now = time.time()
+        db = self._conn()
+        row = db.execute(
+            "SELECT value, latency FROM llm_cache WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def put(self, key: str, provider: str, model: str, value: str, ttl: float, latency: float):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        db = self._conn()
+        db.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, provider, model, value, size, latency, expires, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, value, size, latency, now + ttl, now),
+        )
+        with self._lock:
+            self._puts += 1
+            check = self._puts % 20 == 1
+        if check:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then least-recently-used rows beyond the entry / byte bounds."""
+        db = self._conn()
+        removed = db.execute("DELETE FROM llm_cache WHERE expires <= ?", (time.time(),)).rowcount
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            excess_rows = max(0, count - self.max_entries)
+            excess_bytes = max(0, total - self.max_bytes)
+            victims, freed = [], 0
+            for key, size in db.execute("SELECT key, size FROM llm_cache ORDER BY last_used ASC"):
+                if len(victims) >= excess_rows and freed >= excess_bytes:
+                    break
+                victims.append(key)
+                freed += size
+            db.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k in victims])
+            removed += len(victims)
+        return removed
+
+    # -- main entry point -------------------------------------------------------
+    def completion(self, provider: str, model: str, prompt: str, call: Callable[[], str],
+                   ttl: float, fn: str = "", valid: Optional[Callable[[str], bool]] = None) -> str:
+        """Cached model call: return the stored output for this prompt, or run *call* and store it.
+
+        Exceptions from *call* propagate and nothing is cached; outputs rejected by
+        *valid* are returned but not cached.
+        """
+        fn = fn or provider
+        key = cache_key(provider, model, prompt)
+        try:
+            hit = self.get(key)
+        except sqlite3.Error as exc:
+            print(f"[LLMCache] read failed: {exc}")
+            hit = None
+        if hit is not None:
+            value, latency = hit
+            self._count(fn, "hits")
+            self._count(fn, "saved_s", latency)
+            CACHE_HITS.inc(fn=fn)
+            CACHE_SAVED.inc(latency, fn=fn)
+            if _all_hits.get() is None:
+                _all_hits.set(True)
+            return value
+
+        self._count(fn, "misses")
+        CACHE_MISSES.inc(fn=fn)
+        _all_hits.set(False)
+        t0 = time.perf_counter()
+        value = call()
+        latency = time.perf_counter() - t0
+        if isinstance(value, str) and value and (valid is None or valid(value)):
+            try:
+                self.put(key, provider, model, value, ttl, latency)
+            except sqlite3.Error as exc:
+                print(f"[LLMCache] write failed: {exc}")
+        return value
+
+    def clear(self):
+        self._conn().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        count, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        with self._lock:
+            by_fn = {fn: {**s, "saved_s": round(s["saved_s"], 2)} for fn, s in self._stats.items()}
+        hits = sum(s["hits"] for s in by_fn.values())
+        misses = sum(s["misses"] for s in by_fn.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "saved_s": round(sum(s["saved_s"] for s in by_fn.values()), 2),
+            "entries": count,
+            "bytes": total,
+            "by_fn": by_fn,
+        }
+
+
+def _extract_json(raw: str, opener: str, closer: str, kind: type):
+    if "```" in raw:
+        raw = raw.split("```")[1]
+        if raw.startswith("json"):
+            raw = raw[4:]
+    start, end = raw.find(opener), raw.rfind(closer)
+    if start < 0 or end < start:
+        raise ValueError(f"no JSON {kind.__name__} in answer")
+    data = json.loads(raw[start:end + 1])
+    if not isinstance(data, kind):
+        raise ValueError(f"answer is not a JSON {kind.__name__}")
+    return data
+
+
+def extract_json_object(raw: str) -> dict:
+    """The JSON object in a model answer (code fences / chatter around it allowed).
+
+    Raises ValueError (json.JSONDecodeError included) when it is missing or malformed.
+    """
+    return _extract_json(raw, "{", "}", dict)
+
+
+def extract_json_array(raw: str) -> list:
+    """Like extract_json_object(), for answers that must be a JSON array."""
+    return _extract_json(raw, "[", "]", list)
+
+
+def has_json_object(raw: str) -> bool:
+    """Validator for prompts that must answer with a JSON object — parsed, not just bracketed."""
+    try:
+        extract_json_object(raw)
+        return True
+    except ValueError:
+        return False
+
+
+def has_json_array(raw: str) -> bool:
+    """Validator for prompts that must answer with a JSON array."""
+    try:
+        extract_json_array(raw)
+        return True
+    except ValueError:
+        return False
+
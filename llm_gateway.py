@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+LLM provider gateway — health tracking, rate limits and hedged fallback chains.
+
+Every Gemini / Imagen / TTS / OpenAI / Anthropic / Moonshot SDK call runs
+inside guard(provider), which applies, per provider:
+  * a circuit breaker — CIRCUIT_THRESHOLD consecutive failures open it; while
+    open, calls fail instantly with ProviderUnavailable (so fallbacks kick in
+    without waiting out a timeout); after the cooldown one half-open probe is
+    let through and its outcome closes or re-opens the breaker (the cooldown
+    doubles on each failed probe, up to CIRCUIT_MAX_COOLDOWN);
+  * a concurrency semaphore;
+  * a token-bucket request budget (requests per minute, with burst).
+
+SDK clients come from get_client(): one long-lived client per (provider, key,
+base URL), created lazily, sharing a keep-alive httpx pool (HTTP/2 when the
+`h2` package is installed) — no per-call connection setup or TLS handshake.
+
+A chain is an ordered list of (provider, call) pairs.  The primary fires
+first; if it hasn't produced a valid answer within its hedge budget the next
+provider fires *in parallel*, and the first valid result wins.  A provider that
+fails outright hands over to the next one immediately.  The whole chain is
+bounded by a per-stage deadline.
+
+Hedge budgets come from each provider's recent latency (p90 of successful
+calls), clamped to [HEDGE_MIN, HEDGE_MAX]; until enough samples exist the
+default budget applies.  Answers served entirely from llm_cache are not
+latency samples — a near-zero hit would drag the p90 down to HEDGE_MIN.  LLM_HEDGE_AFTER pins a fixed budget instead.
+
+Env:
+    LLM_<PROVIDER>_CONCURRENCY — max parallel calls, e.g. LLM_GEMINI_CONCURRENCY
+    LLM_<PROVIDER>_RPM         — request budget per minute
+    LLM_HEDGE_AFTER            — fixed hedge budget in seconds (disables p90)
+    LLM_HEDGE_DEFAULT          — budget before a provider has enough samples (default 15)
+    LLM_DEADLINE_<STAGE>       — per-stage deadline in seconds, e.g. LLM_DEADLINE_PICK_STORY
+
+Usage:
+    from llm_gateway import get_client, guard, hedged_call
+    client = get_client("gemini", api_key)
+    with guard("gemini"):
+        resp = client.models.generate_content(...)
+
+    out = await hedged_call("pick_story", [
+        ("gemini", lambda: _pick_gemini(res)),
+        ("openai", lambda: _pick_openai_thinking(res)),
+    ])
+    out["result"], out["provider"], out["attempts"]
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from llm_cache import served_from_cache
+from metrics import counter, gauge
+
+HEDGE_MIN   = 2.0
+HEDGE_MAX   = 30.0
+MIN_SAMPLES = 5
+WINDOW      = 100                  # latency samples kept per provider
+
+_DEFAULT_DEADLINES = {             # stage → seconds for the whole chain
+    "pick_story": 60,
+}
+
+
+def stage_deadline(stage: str) -> float:
+    default = _DEFAULT_DEADLINES.get(stage, 60)
+    return float(os.environ.get(f"LLM_DEADLINE_{stage.upper()}", default))
+
+
+# ---------------------------------------------------------------------------
+# Per-provider latency stats
+# ---------------------------------------------------------------------------
+class LatencyStats:
+    """Rolling window of call latencies per provider. Thread-safe."""
+
+    def __init__(self, window: int = WINDOW):
+        self._lock = threading.Lock()
+        self._ok: dict[str, deque] = {}
+        self._calls: dict[str, dict] = {}      # provider → {ok, failed}
+        self.window = window
+
+    def record(self, provider: str, seconds: float, ok: bool):
+        with self._lock:
+            c = self._calls.setdefault(provider, {"ok": 0, "failed": 0})
+            c["ok" if ok else "failed"] += 1
+            if ok:
+                self._ok.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, provider: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._ok.get(provider, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        k = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[k]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            providers = set(self._calls) | set(self._ok)
+            calls = {p: dict(self._calls.get(p, {})) for p in providers}
+        out = {}
+        for p in sorted(providers):
+            p50, p90 = self.percentile(p, 50), self.percentile(p, 90)
+            out[p] = {**calls[p],
+                      "p50_s": round(p50, 2) if p50 is not None else None,
+                      "p90_s": round(p90, 2) if p90 is not None else None,
+                      "hedge_after_s": round(hedge_budget(p), 2)}
+        return out
+
+
+latency = LatencyStats()
+
+
+def hedge_budget(provider: str) -> float:
+    """Seconds to wait on *provider* before firing the next one in parallel."""
+    fixed = os.environ.get("LLM_HEDGE_AFTER")
+    if fixed:
+        return float(fixed)
+    p90 = latency.percentile(provider, 90)
+    if p90 is None:
+        return float(os.environ.get("LLM_HEDGE_DEFAULT", 15))
+    return min(HEDGE_MAX, max(HEDGE_MIN, p90))
+
+
+def _default_valid(result) -> bool:
+    return isinstance(result, dict) and "error" not in result
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker / concurrency / request budget
+# ---------------------------------------------------------------------------
+CIRCUIT_THRESHOLD    = 5          # consecutive failures that open the breaker
+CIRCUIT_COOLDOWN     = 30.0       # seconds open before the first half-open probe
+CIRCUIT_MAX_COOLDOWN = 300.0
+ACQUIRE_TIMEOUT      = 20.0       # max wait for a semaphore slot / budget token
+
+_PROVIDER_LIMITS = {              # provider → (max concurrency, requests per minute)
+    "gemini":     (8, 120),
+    "gemini_tts": (2, 20),
+    "imagen":     (2, 10),
+    "openai":     (4, 60),
+    "anthropic":  (4, 50),
+    "moonshot":   (4, 50),
+}
+_ALIASES = {"claude": "anthropic", "kimi": "moonshot"}
+
+REJECTED = counter("llm_rejected", "Provider calls refused by the gateway", ["provider", "reason"])
+
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider whose breaker is open or whose budget is exhausted."""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = CIRCUIT_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a call go through now? In half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def available(self) -> bool:
+        """Non-mutating allow() — would a call be let through right now?"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown
+            return not self.probe_in_flight
+
+    def cancel(self):
+        """A call allowed by allow() never reached the provider."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self.probe_in_flight = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(CIRCUIT_MAX_COOLDOWN, self.cooldown * 2)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.threshold:
+                self._open()
+            self.probe_in_flight = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+            return {"state": self.state, "failures": self.failures, "trips": self.trips,
+                    "retry_in_s": retry_in}
+
+
+class TokenBucket:
+    """Classic token bucket: *rate* tokens/s, up to *burst* banked."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def available(self) -> bool:
+        """Non-consuming acquire(0) — is a token banked right now?"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= 1
+
+
+class _Provider:
+    def __init__(self, name: str):
+        conc, rpm = _PROVIDER_LIMITS.get(name, (4, 60))
+        key = name.upper()
+        conc = int(os.environ.get(f"LLM_{key}_CONCURRENCY", conc))
+        rpm = float(os.environ.get(f"LLM_{key}_RPM", rpm))
+        self.name = name
+        self.concurrency = conc
+        self.breaker = CircuitBreaker()
+        self.semaphore = threading.BoundedSemaphore(conc)
+        self.bucket = TokenBucket(rate=rpm / 60.0, burst=max(1.0, min(rpm, conc * 2)))
+        self.in_flight = 0
+
+
+_providers: dict[str, _Provider] = {}
+_providers_lock = threading.Lock()
+
+
+def _provider(name: str) -> _Provider:
+    name = _ALIASES.get(name, name)
+    with _providers_lock:
+        p = _providers.get(name)
+        if p is None:
+            p = _providers[name] = _Provider(name)
+        return p
+
+
+def unavailable_reason(provider: str) -> Optional[str]:
+    """"circuit_open" / "rate_budget" when *provider* would be refused right now, else None."""
+    p = _provider(provider)
+    if not p.breaker.available():
+        return "circuit_open"
+    if not p.bucket.available():
+        return "rate_budget"
+    return None
+
+
+def is_available(provider: str) -> bool:
+    """False while *provider*'s breaker is open or its budget is empty (fallbacks skip it)."""
+    return unavailable_reason(provider) is None
+
+
+@contextmanager
+def guard(provider: str, timeout: float = ACQUIRE_TIMEOUT):
+    """Run one provider call under its breaker, semaphore and request budget.
+
+    Raises ProviderUnavailable without calling the provider when the breaker is
+    open or no slot/token frees up within *timeout*.  Any exception from the
+    body counts as a provider failure.
+    """
+    p = _provider(provider)
+    if not p.breaker.allow():
+        REJECTED.inc(provider=p.name, reason="circuit_open")
+        raise ProviderUnavailable(f"{p.name}: circuit open")
+    if not p.bucket.acquire(timeout):
+        p.breaker.cancel()
+        REJECTED.inc(provider=p.name, reason="rate_budget")
+        raise ProviderUnavailable(f"{p.name}: request budget exhausted")
+    if not p.semaphore.acquire(timeout=timeout):
+        p.breaker.cancel()
+        REJECTED.inc(provider=p.name, reason="concurrency")
+        raise ProviderUnavailable(f"{p.name}: too many concurrent calls")
+    with _providers_lock:
+        p.in_flight += 1
+    try:
+        yield
+    except Exception:
+        p.breaker.failure()
+        raise
+    else:
+        p.breaker.success()
+    finally:
+        with _providers_lock:
+            p.in_flight -= 1
+        p.semaphore.release()
+
+
+def guarded(provider: str, fn: Callable, *args, **kwargs):
+    """fn(*args, **kwargs) under guard(provider) — for asyncio.to_thread(guarded, …)."""
+    with guard(provider):
+        return fn(*args, **kwargs)
+
+
+def provider_states() -> dict:
+    with _providers_lock:
+        providers = list(_providers.values())
+    return {p.name: {**p.breaker.snapshot(), "in_flight": p.in_flight,
+                     "concurrency": p.concurrency, "tokens": round(p.bucket.tokens, 1)}
+            for p in providers}
+
+
+_STATE_CODE = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+gauge("llm_circuit_state", "Breaker state per provider (0 closed, 1 half-open, 2 open)", ["provider"],
+      fn=lambda: {(name, ): _STATE_CODE[s["state"]] for name, s in provider_states().items()})
+
+
+# ---------------------------------------------------------------------------
+# Shared SDK clients
+# ---------------------------------------------------------------------------
+HTTP2 = importlib.util.find_spec("h2") is not None
+POOL_MAX_KEEPALIVE = 20
+POOL_MAX_CONNECTIONS = 50
+POOL_KEEPALIVE_EXPIRY = 120.0      # seconds an idle connection stays open
+
+_BASE_URLS = {"moonshot": "https://api.moonshot.ai/v1"}
+
+_clients: dict[tuple, object] = {}
+_client_stats: dict[str, dict] = {}     # provider → {created, reused, setup_s}
+_clients_lock = threading.Lock()
+
+
+def http_client():
+    """A pooled, keep-alive httpx.Client (HTTP/2 when available) for an SDK to share."""
+    import httpx
+
+    return httpx.Client(
+        http2=HTTP2,
+        limits=httpx.Limits(max_keepalive_connections=POOL_MAX_KEEPALIVE,
+                            max_connections=POOL_MAX_CONNECTIONS,
+                            keepalive_expiry=POOL_KEEPALIVE_EXPIRY),
+        timeout=httpx.Timeout(120.0, connect=10.0),
+    )
+
+
+def _build_client(provider: str, api_key: str, base_url: Optional[str]):
+    if provider == "gemini":
+        from google import genai
+        from google.genai import types
+        try:
+            options = types.HttpOptions(client_args={"http2": HTTP2})
+            return genai.Client(api_key=api_key, http_options=options)
+        except Exception:            # older google-genai without client_args
+            return genai.Client(api_key=api_key)
+    if provider in ("openai", "moonshot"):
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, base_url=base_url or _BASE_URLS.get(provider),
+                      http_client=http_client())
+    if provider == "anthropic":
+        import anthropic
+        return anthropic.Anthropic(api_key=api_key, http_client=http_client())
+    raise ValueError(f"Unknown SDK provider '{provider}'")
+
+
+def get_client(provider: str, api_key: Optional[str], base_url: Optional[str] = None):
+    """Long-lived SDK client for (provider, key, base URL) — built on first use, then reused.
+
+    provider: "gemini" | "openai" | "moonshot" | "anthropic" (aliases claude / kimi work too).
+    """
+    provider = _ALIASES.get(provider, provider)
+    key = (provider, hashlib.sha256((api_key or "").encode()).hexdigest(), base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        stats = _client_stats.setdefault(provider, {"created": 0, "reused": 0, "setup_s": 0.0})
+        if client is not None:
+            stats["reused"] += 1
+            return client
+        t0 = time.perf_counter()
+        client = _clients[key] = _build_client(provider, api_key, base_url)
+        stats["created"] += 1
+        stats["setup_s"] += time.perf_counter() - t0
+        return client
+
+
+def client_stats() -> dict:
+    """Per-provider client reuse; saved_s estimates the setup time avoided by reuse."""
+    with _clients_lock:
+        out = {}
+        for provider, s in _client_stats.items():
+            avg = s["setup_s"] / s["created"] if s["created"] else 0.0
+            out[provider] = {"created": s["created"], "reused": s["reused"],
+                             "setup_ms": round(avg * 1000, 1),
+                             "saved_s": round(avg * s["reused"], 2)}
+        return {"http2": HTTP2, "providers": out}
+
+
+# ---------------------------------------------------------------------------
+# Hedged chain
+# ---------------------------------------------------------------------------
+async def hedged_call(stage: str, chain: list[tuple[str, Callable[[], dict]]],
+                      valid: Callable[[dict], bool] = _default_valid,
+                      deadline: Optional[float] = None) -> dict:
+    """Run *chain* with hedging. Blocking calls run in threads.
+
+    Returns {"provider", "result", "attempts", "elapsed"}; on total failure
+    provider is None and result is {"error": …} (the last error, the deadline, or
+    "all providers unavailable" when every breaker is open / budget empty).
+    Losing calls can't be interrupted (they're SDK calls in threads); their
+    results are discarded but their latency still feeds the stats.  Calls answered
+    from llm_cache win normally but don't feed the stats.
+    """
+    loop = asyncio.get_running_loop()
+    t_start = loop.time()
+    t_end = t_start + (deadline if deadline is not None else stage_deadline(stage))
+    running: dict[asyncio.Future, tuple[str, float]] = {}
+    attempts: list[dict] = []
+    last_error = "no providers configured"
+    next_i = 0
+
+    def launch(reason: str) -> bool:
+        """Start the next available provider; False if the rest of the chain is unavailable."""
+        nonlocal next_i
+        while next_i < len(chain):
+            refused = unavailable_reason(chain[next_i][0])
+            if refused is None:
+                break
+            attempts.append({"provider": chain[next_i][0], "reason": "skipped",
+                             "outcome": refused, "seconds": 0.0})
+            next_i += 1
+        if next_i >= len(chain):
+            return False
+        provider, fn = chain[next_i]
+        next_i += 1
+        running[asyncio.ensure_future(asyncio.to_thread(served_from_cache, fn))] = (provider, loop.time())
+        attempts.append({"provider": provider, "reason": reason,
+                         "start_s": round(loop.time() - t_start, 2)})
+        return True
+
+    def finish(task: asyncio.Future, provider: str, t0: float) -> tuple[dict, bool]:
+        elapsed = loop.time() - t0
+        try:
+            result, cached = task.result()
+        except Exception as exc:
+            result, cached = {"error": f"{provider}: {exc}"}, False
+        ok = valid(result)
+        if not cached:
+            latency.record(provider, elapsed, ok)
+        for a in attempts:
+            if a["provider"] == provider and "seconds" not in a:
+                a["seconds"] = round(elapsed, 2)
+                a["outcome"] = "ok" if ok else "error"
+                break
+        return result, ok
+
+    def abandon():
+        """Let still-running losers finish in the background, recording their latency."""
+        for task, (provider, t0) in running.items():
+            task.add_done_callback(lambda t, p=provider, s=t0: finish(t, p, s))
+        running.clear()
+
+    if chain and not launch("primary"):
+        last_error = f"{stage}: all providers unavailable"
+
+    while running:
+        now = loop.time()
+        if now >= t_end:
+            last_error = f"{stage}: deadline {t_end - t_start:.0f}s exceeded"
+            break
+        wait_for = t_end - now
+        if next_i < len(chain):
+            newest_provider, newest_t0 = list(running.values())[-1]
+            hedge_at = newest_t0 + hedge_budget(newest_provider)
+            wait_for = min(wait_for, max(0.0, hedge_at - now))
+
+        done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            if next_i < len(chain) and loop.time() < t_end:
+                launch("hedge")
+            continue
+
+        for task in done:
+            provider, t0 = running.pop(task)
+            result, ok = finish(task, provider, t0)
+            if ok:
+                abandon()
+                return {"provider": provider, "result": result, "attempts": attempts,
+                        "elapsed": round(loop.time() - t_start, 2)}
+            last_error = result.get("error", "invalid response") if isinstance(result, dict) else "invalid response"
+
+        if not running and next_i < len(chain) and not launch("fallback"):
+            last_error = f"{last_error} (remaining providers unavailable)"
+
+    abandon()
+    return {"provider": None, "result": {"error": last_error}, "attempts": attempts,
+            "elapsed": round(loop.time() - t_start, 2)}
+
+
+def gateway_stats() -> dict:
+    """Breaker states, latency and hedge budgets for /api/status."""
+    return {"providers": provider_states(),
+            "clients": client_stats(),
+            "latency": latency.snapshot(),
+            "deadlines": {s: stage_deadline(s) for s in _DEFAULT_DEADLINES}}
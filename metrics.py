@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Lightweight in-process metrics registry with Prometheus text exposition.
+
+No client library needed — counters, gauges (static or callback) and
+histograms with labels, rendered by render() for GET /metrics.
+
+Usage:
+    from metrics import counter, histogram, gauge
+    RENDER = histogram("card_render_seconds", "Card render time", ["engine"])
+    with RENDER.time(engine="pillow"):
+        ...
+    gauge("rss_queue_depth", "Queued RSS articles", fn=lambda: len(queue))
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import requests
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_registry: dict[str, "_Metric"] = {}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labels)
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _header(self) -> list[str]:
+        # text format 0.0.4: HELP/TYPE name the sample itself, which carries _total
+        return [f"# HELP {self.name}_total {self.doc}", f"# TYPE {self.name}_total {self.kind}"]
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        with _lock:
+            items = list(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}_total{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labels=(), fn=None):
+        super().__init__(name, doc, labels)
+        self.fn = fn     # callback → number, or {label tuple: number} for labelled gauges
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        if self.fn is not None:
+            try:
+                v = self.fn()
+            except Exception:
+                return lines
+            items = list(v.items()) if isinstance(v, dict) else [((), v)]
+        else:
+            with _lock:
+                items = list(self._values.items())
+        for key, v in items:
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def timed(self, **labels):
+        """Decorator form of time()."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        with _lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        for key, (counts, total, n) in items:
+            for bound, c in zip(self.buckets, counts):
+                le = 'le="' + _fmt_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {c}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            return existing
+        metric = _registry[name] = cls(name, *args, **kwargs)
+        return metric
+
+
+def counter(name: str, doc: str, labels=()) -> Counter:
+    return _register(Counter, name, doc, labels)
+
+
+def gauge(name: str, doc: str, labels=(), fn=None) -> Gauge:
+    return _register(Gauge, name, doc, labels, fn=fn)
+
+
+def histogram(name: str, doc: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, doc, labels, buckets=buckets)
+
+
+def render() -> str:
+    """All metrics in Prometheus text format (version 0.0.4)."""
+    with _lock:
+        metrics = list(_registry.values())
+    lines = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Shared instruments
+# ---------------------------------------------------------------------------
+LLM_LATENCY = histogram("llm_call_seconds", "LLM call latency", ["provider", "fn"])
+LLM_ERRORS  = counter("llm_errors", "LLM calls that failed or fell back", ["provider", "fn"])
+HTTP_LATENCY = histogram("external_request_seconds", "Outbound API request latency",
+                         ["api", "endpoint", "status"])
+HTTP_ERRORS  = counter("external_request_errors", "Outbound API requests that raised", ["api", "endpoint"])
+
+
+def instrument_llm(provider, fn_name: str):
+    """Decorator: time an LLM helper; `{"error": …}` results and exceptions count as errors.
+
+    *provider* may be a zero-arg callable for helpers whose backend is chosen at call time.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            prov = provider() if callable(provider) else provider
+            t0 = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                LLM_ERRORS.inc(provider=prov, fn=fn_name)
+                raise
+            finally:
+                LLM_LATENCY.observe(time.perf_counter() - t0, provider=prov, fn=fn_name)
+            if isinstance(result, dict) and "error" in result:
+                LLM_ERRORS.inc(provider=prov, fn=fn_name)
+            return result
+        return wrapper
+    return decorator
+
+
+def _endpoint_label(url: str) -> str:
+    """Last path segment, or "node" for ids — keeps label cardinality (and tokens) out."""
+    seg = url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+    if not seg or any(ch.isdigit() for ch in seg) or seg.startswith("bot"):
+        return "node"
+    return seg
+
+
+def timed_request(api: str, method: str, url: str, **kwargs) -> requests.Response:
+    """requests.request() with latency / error metrics labelled by api + endpoint."""
+    endpoint = _endpoint_label(url)
+    t0 = time.perf_counter()
+    try:
+        resp = requests.request(method, url, **kwargs)
+    except Exception:
+        HTTP_ERRORS.inc(api=api, endpoint=endpoint)
+        HTTP_LATENCY.observe(time.perf_counter() - t0, api=api, endpoint=endpoint, status="error")
+        raise
+    HTTP_LATENCY.observe(time.perf_counter() - t0, api=api, endpoint=endpoint,
+                         status=str(resp.status_code))
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Event-loop lag
+# ---------------------------------------------------------------------------
+LOOP_LAG = histogram("event_loop_lag_seconds", "Extra delay of a 0.5 s asyncio sleep",
+                     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+
+async def monitor_event_loop(interval: float = 0.5):
+    """Background task: how late does the loop wake us? (blocking calls show up here)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - t0 - interval))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate story clustering — MinHash + LSH over normalised headline text.
+
+CNN Top Stories, CNN World, BBC and interpressnews often carry the same event
+under different URLs.  Each incoming article is reduced to a MinHash
+signature of its (stop-word-free, prefix-stemmed) title + description words;
+LSH bands find candidate clusters in O(bands) and the estimated Jaccard
+similarity decides.  Only a cluster's first article (the leader) goes on to
+translation / the queue; later copies are recorded on the leader under
+"also_reported_by".  A cluster can hold several signatures, so adding the
+Georgian translation of an RSS leader lets Georgian-language sources match it
+too.  Clusters older than the window are forgotten.
+
+Usage:
+    from near_dup import NearDupIndex
+    index = NearDupIndex(window_s=12 * 3600, threshold=0.5)
+    leader = index.find(title + " " + desc)
+    if leader is None:
+        cid = index.add(title + " " + desc, article)     # new cluster, article leads
+        index.extend(cid, title_ka + " " + desc_ka)      # after translation
+    else:
+        index.attach(leader, article)                    # → leader["also_reported_by"]
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+NUM_PERM = 64
+BANDS = 32                   # 32 bands × 2 rows: J=0.5 pairs are candidates ~99.99% of the time
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+
+_rng = random.Random(0x5EED)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    # English
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were", "has", "have",
+    "had", "its", "his", "her", "their", "they", "not", "but", "after", "over", "into", "about",
+    "will", "would", "could", "says", "said", "new", "more", "than", "who", "what", "how", "why",
+    "out", "been", "being", "also", "amid", "via", "you", "your", "our", "all", "can", "may",
+    # Georgian
+    "და", "რომ", "არის", "ეს", "თუ", "მის", "მისი", "მიერ", "შესახებ", "ასევე", "კი",
+    "უნდა", "იყო", "იქნება", "როგორც", "ამ", "იმ", "რაც", "ვინ", "რა", "არ", "ან", "მაგრამ",
+}
+STEM_LEN = 6                 # crude stemming: English plurals / Georgian case endings collapse
+
+
+def tokens(text: str) -> set[str]:
+    """Normalised word set: lower-case, no stop words / short words, prefix-stemmed."""
+    return {w[:STEM_LEN] for w in _WORD.findall((text or "").lower())
+            if len(w) > 2 and w not in _STOPWORDS and not w.isdigit()}
+
+
+def signature(text: str) -> Optional[tuple]:
+    """MinHash signature of the text's token set (None for empty text)."""
+    toks = tokens(text)
+    if not toks:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "big")
+              for t in toks]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class NearDupIndex:
+    """Time-windowed clusters of near-duplicate articles."""
+
+    def __init__(self, window_s: float = 12 * 3600, threshold: float = 0.5, max_clusters: int = 2000):
+        self.window_s = window_s
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self._lock = threading.Lock()
+        self._clusters: "OrderedDict[int, dict]" = OrderedDict()   # id → {leader, sigs, updated}
+        self._buckets: dict[tuple, set[int]] = {}
+        self._next_id = 1
+        self._stats = {"checked": 0, "duplicates": 0}
+
+    @staticmethod
+    def _bands(sig: tuple):
+        for i in range(BANDS):
+            yield (i, sig[i * ROWS:(i + 1) * ROWS])
+
+    def _prune(self, now: float):
+        """Forget clusters untouched for window_s, and the oldest beyond max_clusters."""
+        while self._clusters:
+            cid, cl = next(iter(self._clusters.items()))
+            if now - cl["updated"] < self.window_s and len(self._clusters) <= self.max_clusters:
+                break
+            self._clusters.pop(cid)
+            for sig in cl["sigs"]:
+                for band in self._bands(sig):
+                    ids = self._buckets.get(band)
+                    if ids is not None:
+                        ids.discard(cid)
+                        if not ids:
+                            del self._buckets[band]
+
+    def _index(self, cid: int, sig: tuple):
+        self._clusters[cid]["sigs"].append(sig)
+        for band in self._bands(sig):
+            self._buckets.setdefault(band, set()).add(cid)
+
+    def find(self, text: str, now: Optional[float] = None) -> Optional[dict]:
+        """Leader article of the best-matching live cluster, or None."""
+        sig = signature(text)
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+            self._stats["checked"] += 1
+            if sig is None:
+                return None
+            candidates = set()
+            for band in self._bands(sig):
+                candidates |= self._buckets.get(band, set())
+            best, best_sim = None, self.threshold
+            for cid in candidates:
+                sim = max(similarity(sig, s) for s in self._clusters[cid]["sigs"])
+                if sim >= best_sim:
+                    best, best_sim = cid, sim
+            if best is None:
+                return None
+            self._stats["duplicates"] += 1
+            cl = self._clusters[best]
+            cl["updated"] = now
+            self._clusters.move_to_end(best)
+            return cl["leader"]
+
+    def add(self, text: str, leader: dict, now: Optional[float] = None) -> int:
+        """Start a new cluster led by *leader*; returns its id."""
+        now = time.time() if now is None else now
+        with self._lock:
+            cid = self._next_id
+            self._next_id += 1
+            self._clusters[cid] = {"leader": leader, "sigs": [], "updated": now}
+            sig = signature(text)
+            if sig is not None:
+                self._index(cid, sig)
+            return cid
+
+    def extend(self, cid: int, text: str):
+        """Add another rendering (e.g. the translation) of a cluster's story."""
+        sig = signature(text)
+        with self._lock:
+            if sig is not None and cid in self._clusters:
+                self._index(cid, sig)
+
+    @staticmethod
+    def attach(leader: dict, article: dict) -> bool:
+        """Record *article* as another source for the leader's story (False if already recorded)."""
+        reported = leader.setdefault("also_reported_by", [])
+        url = article.get("url", "")
+        if url and any(r["url"] == url for r in reported):
+            return False
+        reported.append({
+            "source": article.get("source_name", "interpressnews"),
+            "title": article.get("title", ""),
+            "url": url,
+        })
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["clusters"] = len(self._clusters)
+        s["duplicate_rate"] = round(s["duplicates"] / s["checked"], 3) if s["checked"] else 0.0
+        return s
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Streaming, targeted HTML extraction for the interpressnews scraper.
+
+BeautifulSoup + html.parser built a full tree of every page (navigation,
+scripts, footers) only to read a handful of nodes, and get_text() ran twice
+per paragraph.  These parsers sit directly on the stdlib tokenizer instead:
+no tree is built, state is tracked only inside the containers we care about
+(schema.org Article blocks on category pages, <p> elements on article pages),
+and each text node is visited once.  Output matches the old
+`get_text(strip=True)` extraction.
+
+extract_main_text() additionally finds the article body: every paragraph
+scores its enclosing blocks by text (length, commas, link density, class
+hints), and only paragraphs inside the best block are kept — so sidebars,
+related-news lists and footers stay out of caption prompts.
+
+Usage:
+    from news_parser import parse_category, parse_article_text, extract_main_text, strip_tags
+    articles = parse_category(html)        # [{title, url, image_url, time}, ...]
+    text = parse_article_text(html)        # every paragraph > 20 chars, "\n"-joined
+    body = extract_main_text(html)         # paragraphs of the main-content block only
+    plain = strip_tags("<b>RSS</b> summary")
+
+Benchmark: python benchmarks/bench_news_parser.py
+"""
+
+import re
+from html.parser import HTMLParser
+
+ARTICLE_TYPE = "http://schema.org/Article"
+BASE_URL = "https://interpressnews.ge"
+
+_SKIP_TEXT = {"script", "style", "template", "noscript"}
+_BLOCK_END = {"div", "article", "section", "main", "body", "td", "li"}
+
+
+class _CategoryParser(HTMLParser):
+    """Collects {title, url, image_url, time} from each schema.org Article <div>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items: list[dict] = []
+        self._cur = None          # item being filled, while inside an Article div
+        self._div_depth = 0       # nesting of <div> inside the current Article
+        self._title_parts = None  # collecting <h2 itemprop=name> text
+
+    def handle_starttag(self, tag, attrs):
+        if self._cur is None:
+            if tag == "div":
+                a = dict(attrs)
+                if "itemscope" in a and a.get("itemtype") == ARTICLE_TYPE:
+                    self._cur = {"url": None, "title": None, "image_url": None, "time": None}
+                    self._div_depth = 1
+            return
+
+        if tag == "div":
+            self._div_depth += 1
+            return
+        a = dict(attrs)
+        if tag == "a" and self._cur["url"] is None and a.get("itemprop") == "url":
+            self._cur["url"] = a.get("href") or ""
+        elif tag == "h2" and self._cur["title"] is None and a.get("itemprop") == "name":
+            self._title_parts = []
+        elif tag == "img" and self._cur["image_url"] is None and a.get("itemprop") == "image":
+            self._cur["image_url"] = a.get("data-src") or a.get("src") or ""
+        elif tag == "time" and self._cur["time"] is None:
+            self._cur["time"] = a.get("datetime", "")
+
+    def handle_endtag(self, tag):
+        if self._cur is None:
+            return
+        if tag == "h2" and self._title_parts is not None:
+            self._cur["title"] = "".join(self._title_parts)
+            self._title_parts = None
+        elif tag == "div":
+            self._div_depth -= 1
+            if self._div_depth == 0:
+                self._finish()
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            s = data.strip()
+            if s:
+                self._title_parts.append(s)
+
+    def _finish(self):
+        cur, self._cur = self._cur, None
+        if self._title_parts is not None:                 # unclosed <h2>
+            cur["title"] = "".join(self._title_parts)
+            self._title_parts = None
+        if cur["url"] is None or cur["title"] is None:
+            return
+        href = cur["url"]
+        if href and not href.startswith("http"):
+            href = BASE_URL + href
+        self.items.append({
+            "title": cur["title"],
+            "url": href,
+            "image_url": cur["image_url"] or None,
+            "time": cur["time"] or "",
+        })
+
+
+class _ParagraphParser(HTMLParser):
+    """One pass over <p> elements: stripped text of each, in document order."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs: list[str] = []
+        self._parts = None        # text of the open <p>
+        self._skip = 0            # inside <script>/<style>
+
+    def _close(self):
+        if self._parts is not None:
+            self.paragraphs.append("".join(self._parts))
+            self._parts = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "p":
+            self._close()         # <p> can't nest — a new one ends the previous
+            self._parts = []
+        elif tag in _SKIP_TEXT:
+            self._skip += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "p":
+            self._close()
+            self.paragraphs.append("")
+
+    def handle_endtag(self, tag):
+        if tag == "p" or tag in _BLOCK_END:
+            self._close()
+        elif tag in _SKIP_TEXT and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if self._parts is not None and not self._skip:
+            s = data.strip()
+            if s:
+                self._parts.append(s)
+
+    def close(self):
+        super().close()
+        self._close()
+
+
+_CONTAINERS = {"div", "article", "section", "main", "td", "body", "aside", "footer", "header", "nav", "form"}
+_NEGATIVE = re.compile(r"comment|footer|sidebar|widget|menu|nav|share|social|related|promo|banner|"
+                       r"advert|sponsor|popular|subscribe|breadcrumb|tags?\b|meta", re.I)
+_POSITIVE = re.compile(r"article|body|content|entry|main|post|story|text|news-?detail", re.I)
+_NEGATIVE_TAGS = {"aside", "footer", "header", "nav", "form"}
+
+
+class _DensityParser(HTMLParser):
+    """Paragraphs with their container ancestry and link-text share, for main-content scoring."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.weights: list[float] = []        # container id → class/id/tag prior
+        self.paragraphs: list[tuple] = []     # (text, link_chars, container path)
+        self._stack: list[tuple[str, int]] = []
+        self._parts = None
+        self._link_chars = 0
+        self._in_link = 0
+        self._skip = 0
+
+    def _close_p(self):
+        if self._parts is not None:
+            path = tuple(cid for _, cid in self._stack)
+            self.paragraphs.append(("".join(self._parts), self._link_chars, path))
+            self._parts = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _CONTAINERS:
+            a = dict(attrs)
+            hint = f"{a.get('class') or ''} {a.get('id') or ''}"
+            weight = 0.0
+            if tag in _NEGATIVE_TAGS or _NEGATIVE.search(hint):
+                weight -= 25
+            if tag in ("article", "main") or _POSITIVE.search(hint):
+                weight += 25
+            self._stack.append((tag, len(self.weights)))
+            self.weights.append(weight)
+        elif tag == "p":
+            self._close_p()
+            self._parts, self._link_chars = [], 0
+        elif tag == "a":
+            self._in_link += 1
+        elif tag in _SKIP_TEXT:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag == "p":
+            self._close_p()
+        elif tag in _CONTAINERS:
+            self._close_p()
+            for i in range(len(self._stack) - 1, -1, -1):     # tolerate unclosed children
+                if self._stack[i][0] == tag:
+                    del self._stack[i:]
+                    break
+        elif tag == "a" and self._in_link:
+            self._in_link -= 1
+        elif tag in _SKIP_TEXT and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if self._parts is not None and not self._skip:
+            s = data.strip()
+            if s:
+                self._parts.append(s)
+                if self._in_link:
+                    self._link_chars += len(s)
+
+    def close(self):
+        super().close()
+        self._close_p()
+
+
+def extract_main_text(html: str, min_len: int = 20) -> str:
+    """Paragraph text of the page's main-content block (text-density scoring).
+
+    Each paragraph adds 1 + commas + len/100 (max 3), scaled by its non-link
+    share, to its parent block and half that to the grandparent; blocks start
+    from a class/id/tag prior.  Falls back to parse_article_text() when no
+    block wins.
+    """
+    parser = _DensityParser()
+    parser.feed(html)
+    parser.close()
+
+    scores = list(parser.weights)
+    touched = set()
+    for text, link_chars, path in parser.paragraphs:
+        if len(text) <= min_len or not path:
+            continue
+        points = (1 + text.count(",") + min(3.0, len(text) / 100)) * (1 - link_chars / len(text))
+        scores[path[-1]] += points
+        touched.add(path[-1])
+        if len(path) > 1:
+            scores[path[-2]] += points / 2
+            touched.add(path[-2])
+    if not touched:
+        return parse_article_text(html, min_len)
+
+    best = max(touched, key=lambda cid: scores[cid])
+    return "\n".join(text for text, link_chars, path in parser.paragraphs
+                     if best in path and len(text) > min_len and link_chars < len(text) / 2)
+
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+
+    def handle_data(self, data):
+        s = data.strip()
+        if s:
+            self.parts.append(s)
+
+
+def parse_category(html: str) -> list[dict]:
+    """Article teasers of an interpressnews category page."""
+    parser = _CategoryParser()
+    parser.feed(html)
+    parser.close()
+    if parser._cur is not None:                           # truncated page
+        parser._finish()
+    return parser.items
+
+
+def parse_article_text(html: str, min_len: int = 20) -> str:
+    """Paragraph text of an article page (paragraphs longer than *min_len*)."""
+    parser = _ParagraphParser()
+    parser.feed(html)
+    parser.close()
+    return "\n".join(p for p in parser.paragraphs if len(p) > min_len)
+
+
+def strip_tags(html: str) -> str:
+    """Plain text of an HTML fragment, like BeautifulSoup(...).get_text(strip=True)."""
+    parser = _TextParser()
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.parts)
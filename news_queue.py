@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Scored, persistent priority queue for RSS articles (data/rss_queue.json).
+
+Replaces the FIFO list: the next article sent is the highest-scoring one, so
+fresh breaking news no longer waits behind hours-old items.
+
+    score = weight × 2^(−age / half_life)
+
+`weight` is fixed at push time by the caller (source × category × historical
+engagement).  Because every item decays at the same rate, ordering between
+items never changes, and the heap key  log2(weight) + published / half_life
+is time-invariant — push / pop stay O(log n) with no re-scoring.  Items older
+than the TTL are dropped instead of sent.  The queue is rewritten atomically
+on every change, so it survives restarts.
+
+Usage:
+    from news_queue import NewsQueue
+    queue = NewsQueue()
+    queue.push(article, weight=1.2)
+    article = queue.pop()          # best live article, or None
+    queue.snapshot()               # [{score, age_min, expires_in_min, ...}] best first
+"""
+
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DATA_DIR   = Path(__file__).parent / "data"
+QUEUE_FILE = DATA_DIR / "rss_queue.json"
+
+
+class NewsQueue:
+    """Max-heap of articles by decayed score, with TTL and JSON persistence."""
+
+    def __init__(self, path: Path = QUEUE_FILE, ttl_h: float = 12, half_life_h: float = 3):
+        self.path = Path(path)
+        self.ttl = ttl_h * 3600
+        self.half_life = half_life_h * 3600
+        self._lock = threading.Lock()
+        self._heap: list[tuple] = []            # (-key, seq, entry)
+        self._seq = itertools.count()
+        self._stats = {"pushed": 0, "sent": 0, "expired": 0}
+        self._load()
+
+    # -- scoring ---------------------------------------------------------------
+    def _key(self, entry: dict) -> float:
+        return math.log2(max(entry["weight"], 1e-6)) + entry["published"] / self.half_life
+
+    def score(self, entry: dict, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return entry["weight"] * 2 ** (-(now - entry["published"]) / self.half_life)
+
+    # -- persistence -----------------------------------------------------------
+    def _load(self):
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            print(f"[NewsQueue] Could not load {self.path.name}: {exc}")
+            return
+        for entry in entries:
+            heapq.heappush(self._heap, (-self._key(entry), next(self._seq), entry))
+        print(f"[NewsQueue] Restored {len(entries)} queued articles")
+
+    def _save(self):
+        """Write the queue atomically (caller holds the lock)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps([e for _, _, e in self._heap], ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _expire(self, now: float) -> int:
+        """Drop entries past the TTL (caller holds the lock)."""
+        live = [h for h in self._heap if now - h[2]["published"] < self.ttl]
+        dropped = len(self._heap) - len(live)
+        if dropped:
+            heapq.heapify(live)
+            self._heap = live
+            self._stats["expired"] += dropped
+        return dropped
+
+    # -- queue operations ------------------------------------------------------
+    def push(self, item: dict, weight: float = 1.0, now: Optional[float] = None):
+        """Queue *item*; its age counts from item["published"] (epoch) when known."""
+        now = time.time() if now is None else now
+        published = min(item.get("published") or now, now)
+        entry = {"item": item, "weight": round(weight, 4), "published": published, "queued_at": now}
+        with self._lock:
+            heapq.heappush(self._heap, (-self._key(entry), next(self._seq), entry))
+            self._stats["pushed"] += 1
+            self._save()
+
+    def pop(self, now: Optional[float] = None) -> Optional[dict]:
+        """Remove and return the best-scoring live item (None if empty)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            changed = self._expire(now) > 0
+            item = None
+            if self._heap:
+                item = heapq.heappop(self._heap)[2]["item"]
+                self._stats["sent"] += 1
+                changed = True
+            if changed:
+                self._save()
+            return item
+
+    def update(self, url: str, **fields) -> bool:
+        """Merge *fields* into the queued item with this URL and persist; False if not queued."""
+        with self._lock:
+            for _, _, entry in self._heap:
+                if entry["item"].get("url") == url:
+                    entry["item"].update(fields)
+                    self._save()
+                    return True
+        return False
+
+    def peek(self, n: int = 1) -> list[dict]:
+        """The *n* best items, without removing them."""
+        with self._lock:
+            return [h[2]["item"] for h in heapq.nsmallest(n, self._heap)]
+
+    def snapshot(self, now: Optional[float] = None) -> list[dict]:
+        """Queued items, best first, with their current scores."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = [h[2] for h in sorted(self._heap)]
+        return [{
+            "title": e["item"].get("title_ka") or e["item"].get("title", ""),
+            "url": e["item"].get("url", ""),
+            "source": e["item"].get("source_name", ""),
+            "category": e["item"].get("source_cat", ""),
+            "also_reported_by": [r["source"] for r in e["item"].get("also_reported_by", [])],
+            "weight": e["weight"],
+            "score": round(self.score(e, now), 4),
+            "age_min": round((now - e["published"]) / 60, 1),
+            "expires_in_min": round(max(0.0, self.ttl - (now - e["published"])) / 60, 1),
+        } for e in entries]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._heap),
+                    "ttl_h": self.ttl / 3600, "half_life_h": self.half_life / 3600}
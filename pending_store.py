@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Persistent store of news awaiting admin approval (data/pending_news.db).
+
+`_pending_news` used to be a plain dict: items nobody acted on stayed in
+memory forever, and a restart forgot every pending item, leaving approve /
+reject buttons in Telegram that no longer worked.  PendingStore keeps the
+same dict-style interface (`store[id] = article`, `pop`, `values`, `len`) on
+top of SQLite, so pending items survive restarts and old buttons keep working.
+
+Each item expires `ttl_h` hours after it was sent; beyond `max_items` the
+oldest are expired early.  The Telegram message carrying the buttons is
+recorded with set_message(), so a periodic sweep can take_expired() and edit
+those messages (e.g. "expired", buttons removed) in batches.
+
+Usage:
+    from pending_store import PendingStore
+    pending = PendingStore()
+    pending[news_id] = article
+    pending.set_message(news_id, chat_id, message_id, "photo")
+    article = pending.pop(news_id, None)          # approve / reject
+    for item in pending.take_expired(limit=50):   # {id, article, chat_id, message_id, kind}
+        ...
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DATA_DIR = Path(__file__).parent / "data"
+DB_FILE  = DATA_DIR / "pending_news.db"
+
+
+class PendingStore:
+    """Dict-like, TTL- and size-bounded pending-approval store."""
+
+    def __init__(self, path: Path = DB_FILE, ttl_h: float = 48, max_items: int = 300):
+        self.path = Path(path)
+        self.ttl = ttl_h * 3600
+        self.max_items = max_items
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._conn()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " id TEXT PRIMARY KEY,"
+            " article TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " expires REAL NOT NULL,"
+            " chat_id TEXT,"
+            " message_id INTEGER,"
+            " kind TEXT)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS pending_expires ON pending(expires)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 objects aren't shareable across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    # -- dict interface ----------------------------------------------------------
+    def __setitem__(self, news_id: str, article: dict):
+        now = time.time()
+        db = self._conn()
+        db.execute(
+            "INSERT OR REPLACE INTO pending (id, article, created, expires) VALUES (?, ?, ?, ?)",
+            (news_id, json.dumps(article, ensure_ascii=False), now, now + self.ttl),
+        )
+        # Over capacity: expire the oldest now so the next sweep retires their buttons
+        db.execute(
+            "UPDATE pending SET expires = ? WHERE id IN ("
+            " SELECT id FROM pending WHERE expires > ? ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (now, now, self.max_items),
+        )
+
+    def get(self, news_id: str, default=None) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT article FROM pending WHERE id = ? AND expires > ?", (news_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def pop(self, news_id: str, default=None) -> Optional[dict]:
+        """Remove and return a live item (an expired one counts as gone)."""
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT article, expires FROM pending WHERE id = ?", (news_id,)).fetchone()
+            if row is not None and row[1] > time.time():
+                db.execute("DELETE FROM pending WHERE id = ?", (news_id,))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        if row is None or row[1] <= time.time():
+            return default
+        return json.loads(row[0])
+
+    def values(self) -> list[dict]:
+        rows = self._conn().execute(
+            "SELECT article FROM pending WHERE expires > ? ORDER BY created", (time.time(),)
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def update_by_url(self, url: str, **fields) -> int:
+        """Merge *fields* into every live item whose article URL is *url*; returns the count."""
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute("SELECT id, article FROM pending WHERE expires > ?",
+                              (time.time(),)).fetchall()
+            changed = 0
+            for news_id, raw in rows:
+                article = json.loads(raw)
+                if article.get("url") == url:
+                    article.update(fields)
+                    db.execute("UPDATE pending SET article = ? WHERE id = ?",
+                               (json.dumps(article, ensure_ascii=False), news_id))
+                    changed += 1
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return changed
+
+    def __len__(self) -> int:
+        (count,) = self._conn().execute(
+            "SELECT COUNT(*) FROM pending WHERE expires > ?", (time.time(),)
+        ).fetchone()
+        return count
+
+    def __contains__(self, news_id: str) -> bool:
+        return self.get(news_id) is not None
+
+    # -- Telegram message bookkeeping -------------------------------------------
+    def set_message(self, news_id: str, chat_id, message_id: int, kind: str):
+        """Remember which Telegram message (kind "photo" / "text") carries the buttons."""
+        self._conn().execute(
+            "UPDATE pending SET chat_id = ?, message_id = ?, kind = ? WHERE id = ?",
+            (str(chat_id), message_id, kind, news_id),
+        )
+
+    def take_expired(self, limit: int = 50) -> list[dict]:
+        """Remove up to *limit* expired items and return them with their message ids."""
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT id, article, chat_id, message_id, kind FROM pending"
+                " WHERE expires <= ? ORDER BY expires LIMIT ?", (time.time(), limit)
+            ).fetchall()
+            db.executemany("DELETE FROM pending WHERE id = ?", [(r[0],) for r in rows])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return [{"id": r[0], "article": json.loads(r[1]), "chat_id": r[2],
+                 "message_id": r[3], "kind": r[4]} for r in rows]
+
+    def stats(self) -> dict:
+        now = time.time()
+        live, expired = self._conn().execute(
+            "SELECT COALESCE(SUM(expires > ?), 0), COALESCE(SUM(expires <= ?), 0) FROM pending",
+            (now, now),
+        ).fetchone()
+        return {"pending": live, "awaiting_sweep": expired,
+                "ttl_h": self.ttl / 3600, "max_items": self.max_items}
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Perceptual-hash index for the photo library (photos/).
+
+Every library photo gets a 64-bit dHash plus its SHA-256.  Hashes live in a
+BK-tree so "is there a photo within Hamming distance N of this one?" is a
+sub-millisecond query even for thousands of photos.  Used by the upload
+endpoints to link near-duplicates instead of saving `name_1.jpg`, `name_2.jpg`…
+
+Usage:
+    from photo_index import get_index
+    idx = get_index(PHOTOS)
+    dup = idx.find_duplicate("/tmp/upload.jpg")   # → "existing.jpg" or None
+    idx.add("new.jpg")
+
+Backfill (one-off, or after a bulk git sync):
+    python photo_index.py [photos_dir]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DATA_DIR = Path(__file__).parent / "data"
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# Max Hamming distance (out of 64 bits) that still counts as the same picture
+DUP_RADIUS = int(os.environ.get("PHOTO_DUP_RADIUS", 6))
+# Max per-channel difference of the average colour (0-255) — dHash only sees
+# gradients, so two flat images of different colours would otherwise collide
+DUP_COLOR_TOLERANCE = 24
+
+
+# ---------------------------------------------------------------------------
+# Hashing
+# ---------------------------------------------------------------------------
+def dhash(path: str) -> tuple[int, tuple[int, int, int]]:
+    """Return (64-bit difference hash, average RGB colour) for an image file."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        # JPEG draft mode decodes at 1/2…1/8 scale — big uploads hash in ms
+        img.draft("RGB", (64, 64))
+        small = img.convert("RGB").resize((9, 8), Image.BILINEAR)
+
+    raw = small.tobytes()
+    pixels = [tuple(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+    n = len(pixels)
+    color = tuple(sum(p[c] for p in pixels) // n for c in range(3))
+
+    gray = [(r * 299 + g * 587 + b * 114) // 1000 for r, g, b in pixels]
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = gray[row * 9 + col]
+            right = gray[row * 9 + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return bits, color
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def state_file_for(directory: Path) -> Path:
+    """Per-directory state file under DATA_DIR (data/photo_index-<dir>-<hash>.json)."""
+    resolved = str(Path(directory).resolve())
+    tag = hashlib.sha1(resolved.encode("utf-8")).hexdigest()[:10]
+    return DATA_DIR / f"photo_index-{Path(resolved).name}-{tag}.json"
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# ---------------------------------------------------------------------------
+# BK-tree  (metric tree over Hamming distance)
+# ---------------------------------------------------------------------------
+class _BKTree:
+    """BK-tree keyed by 64-bit hashes. Each node holds the file names sharing that hash."""
+
+    def __init__(self):
+        self.root = None     # [hash, {distance: child_node}, set(names)]
+
+    def add(self, h: int, name: str):
+        if self.root is None:
+            self.root = [h, {}, {name}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[2].add(name)
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [h, {}, {name}]
+                return
+            node = child
+
+    def discard(self, h: int, name: str):
+        """Lazy delete — the node stays in the tree, only the name is dropped."""
+        node = self.root
+        while node is not None:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[2].discard(name)
+                return
+            node = node[1].get(d)
+
+    def query(self, h: int, radius: int) -> list[tuple[int, str]]:
+        """All (distance, name) pairs within *radius* of *h*, nearest first."""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                found.extend((d, n) for n in node[2])
+            lo, hi = d - radius, d + radius
+            for dist, child in node[1].items():
+                if lo <= dist <= hi:
+                    stack.append(child)
+        found.sort()
+        return found
+
+
+# ---------------------------------------------------------------------------
+# Photo index
+# ---------------------------------------------------------------------------
+class PhotoIndex:
+    """dHash + SHA-256 index of one photo directory. Thread-safe."""
+
+    def __init__(self, directory: Path, state_file: Optional[Path] = None):
+        self.directory = Path(directory)
+        self.state_file = Path(state_file) if state_file else state_file_for(self.directory)
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}   # name → {dhash, color, sha256, size, mtime}
+        self._by_sha: dict[str, str] = {}
+        self._tree = _BKTree()
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+    def _load(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if state.get("directory") != str(self.directory.resolve()):
+            return
+        for name, e in state.get("entries", {}).items():
+            e["dhash"] = int(e["dhash"], 16)
+            e["color"] = tuple(e["color"])
+            self._insert(name, e)
+
+    def _save(self):
+        state = {
+            "directory": str(self.directory.resolve()),
+            "entries": {
+                name: {**e, "dhash": f"{e['dhash']:016x}", "color": list(e["color"])}
+                for name, e in self._entries.items()
+            },
+        }
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp, self.state_file)
+        except OSError as exc:
+            print(f"[PhotoIndex] Save failed: {exc}")
+
+    # -- internal ------------------------------------------------------------
+    def _insert(self, name: str, entry: dict):
+        self._entries[name] = entry
+        self._by_sha[entry["sha256"]] = name
+        self._tree.add(entry["dhash"], name)
+
+    def _drop(self, name: str):
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return
+        if self._by_sha.get(entry["sha256"]) == name:
+            del self._by_sha[entry["sha256"]]
+        self._tree.discard(entry["dhash"], name)
+
+    @staticmethod
+    def _describe(path: Path, sha256: Optional[str] = None) -> dict:
+        st = path.stat()
+        h, color = dhash(str(path))
+        return {"dhash": h, "color": color, "sha256": sha256 or file_sha256(str(path)),
+                "size": st.st_size, "mtime": st.st_mtime}
+
+    # -- public API ----------------------------------------------------------
+    def refresh(self) -> dict:
+        """Sync the index with the directory (backfill). Only new/changed files are hashed."""
+        t0 = time.perf_counter()
+        added = removed = 0
+        on_disk = {}
+        if self.directory.exists():
+            for f in self.directory.iterdir():
+                if f.is_file() and not f.name.startswith(".") and f.suffix.lower() in IMAGE_EXTS:
+                    on_disk[f.name] = f
+
+        with self._lock:
+            for name in list(self._entries):
+                if name not in on_disk:
+                    self._drop(name)
+                    removed += 1
+
+        for name, f in on_disk.items():
+            try:
+                st = f.stat()
+                with self._lock:
+                    cur = self._entries.get(name)
+                    if cur and cur["size"] == st.st_size and cur["mtime"] == st.st_mtime:
+                        continue
+                entry = self._describe(f)
+            except Exception as exc:
+                print(f"[PhotoIndex] Skip {name}: {exc}")
+                continue
+            with self._lock:
+                self._drop(name)
+                self._insert(name, entry)
+            added += 1
+
+        if added or removed:
+            with self._lock:
+                self._save()
+        took = time.perf_counter() - t0
+        print(f"[PhotoIndex] {self.directory}: {len(self._entries)} photos "
+              f"(+{added} −{removed}) in {took:.2f}s")
+        return {"photos": len(self._entries), "added": added, "removed": removed, "seconds": round(took, 3)}
+
+    def find_duplicate(self, path: str, sha256: Optional[str] = None,
+                       radius: int = DUP_RADIUS) -> Optional[str]:
+        """Return the library file name of an identical / near-identical photo, or None."""
+        sha256 = sha256 or file_sha256(path)
+        h, color = dhash(path)
+        with self._lock:
+            candidates = []
+            exact = self._by_sha.get(sha256)
+            if exact:
+                candidates.append(exact)
+            for _, name in self._tree.query(h, radius):
+                e = self._entries[name]
+                if max(abs(a - b) for a, b in zip(e["color"], color)) <= DUP_COLOR_TOLERANCE:
+                    candidates.append(name)
+            stale = [n for n in candidates if not (self.directory / n).exists()]
+            for n in stale:
+                self._drop(n)
+        for name in candidates:
+            if name not in stale:
+                return name
+        return None
+
+    def add(self, name: str, sha256: Optional[str] = None):
+        """Index a file that was just written to the directory."""
+        path = self.directory / name
+        try:
+            entry = self._describe(path, sha256)
+        except Exception as exc:
+            print(f"[PhotoIndex] Add {name} failed: {exc}")
+            return
+        with self._lock:
+            self._drop(name)
+            self._insert(name, entry)
+            self._save()
+
+    def remove(self, name: str):
+        with self._lock:
+            self._drop(name)
+            self._save()
+
+    def rename(self, old_name: str, new_name: str):
+        with self._lock:
+            entry = self._entries.get(old_name)
+            if entry is None:
+                return
+            self._drop(old_name)
+            self._insert(new_name, entry)
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_indexes: dict[str, PhotoIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(directory: Path) -> PhotoIndex:
+    """Return the (lazily built) index for *directory*.
+
+    The index is registered as soon as its saved state is loaded; the first
+    caller then runs the backfill refresh outside the global lock, so uploads
+    made meanwhile use the saved state instead of waiting for the whole
+    library to be hashed.
+    """
+    key = str(Path(directory).resolve())
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        created = idx is None
+        if created:
+            idx = PhotoIndex(Path(directory))
+            _indexes[key] = idx
+    if created:
+        idx.refresh()
+    return idx
+
+
+# ---------------------------------------------------------------------------
+# CLI backfill
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("photos")
+    index = get_index(target)
+    # report the near-duplicate groups that already exist in the library
+    seen = set()
+    for name, e in sorted(index._entries.items()):
+        if name in seen:
+            continue
+        group = [n for _, n in index._tree.query(e["dhash"], DUP_RADIUS) if n != name]
+        if group:
+            seen.update(group)
+            print(f"  {name} ≈ {', '.join(group)}")
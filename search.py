@@ -1,16 +1,113 @@
 #!/usr/bin/env python3
-"""Web-search and image-download helpers used by the agent as tools."""
+"""Web-search and image-download helpers used by the agent as tools.
 
+Search results are cached for SEARCH_CACHE_TTL seconds per (engine, normalized
+query, max_results), and concurrent identical queries share one request.
+Images from a search can be prefetched into IMG_CACHE while the LLM works;
+race_images() picks them up from there.
+"""
+
+import copy
+import hashlib
+import io
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import wraps
 from pathlib import Path
 from typing import Optional
 
 import requests
 
+CARD_W, CARD_H = 1080, 1350
+
+# Downloaded-but-unused race candidates land here (swept by the janitor)
+IMG_CACHE = Path("temp/img_cache")
+
+IMAGE_RACE_DEADLINE = float(os.environ.get("IMAGE_RACE_DEADLINE", 12))   # seconds for the whole race
+MIN_IMAGE_SIDE      = int(os.environ.get("MIN_IMAGE_SIDE", 400))         # px, shorter side
+MAX_IMAGE_BYTES     = 15 * 1024 * 1024
+
+SEARCH_CACHE_TTL  = float(os.environ.get("SEARCH_CACHE_TTL", 300))    # seconds
+SEARCH_CACHE_SIZE = 256
+
+
+# ---------------------------------------------------------------------------
+# Search-result cache  (TTL + single-flight)
+# ---------------------------------------------------------------------------
+_search_lock = threading.Lock()
+_search_cache: OrderedDict[tuple, tuple[float, object]] = OrderedDict()   # key → (expires, result)
+_search_inflight: dict[tuple, Future] = {}
+_search_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+def _normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def _is_error(result) -> bool:
+    if isinstance(result, dict):
+        return "error" in result
+    return bool(result) and isinstance(result[0], dict) and "error" in result[0]
+
+
+def _cached_search(engine: str):
+    """Decorator: TTL-cache a search function and coalesce identical concurrent calls."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(query: str, max_results: int = 5):
+            key = (engine, _normalize_query(query), max_results)
+            with _search_lock:
+                entry = _search_cache.get(key)
+                if entry and entry[0] > time.monotonic():
+                    _search_cache.move_to_end(key)
+                    _search_stats["hits"] += 1
+                    return copy.deepcopy(entry[1])
+                leader = _search_inflight.get(key)
+                if leader is None:
+                    fut = _search_inflight[key] = Future()
+                    _search_stats["misses"] += 1
+                else:
+                    _search_stats["coalesced"] += 1
+            if leader is not None:
+                return copy.deepcopy(leader.result())
+
+            try:
+                result = func(query, max_results)
+            except BaseException as exc:
+                with _search_lock:
+                    _search_inflight.pop(key, None)
+                fut.set_exception(exc)
+                raise
+            with _search_lock:
+                _search_inflight.pop(key, None)
+                if not _is_error(result):
+                    _search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, result)
+                    _search_cache.move_to_end(key)
+                    while len(_search_cache) > SEARCH_CACHE_SIZE:
+                        _search_cache.popitem(last=False)
+            fut.set_result(result)
+            return copy.deepcopy(result)
+        return wrapper
+    return decorator
+
+
+def search_cache_stats() -> dict:
+    with _search_lock:
+        served = _search_stats["hits"] + _search_stats["misses"] + _search_stats["coalesced"]
+        saved = _search_stats["hits"] + _search_stats["coalesced"]
+        return {**_search_stats, "entries": len(_search_cache),
+                "hit_rate": round(saved / served, 3) if served else 0.0,
+                "prefetched": _prefetch_stats["stored"]}
+
 
 # ---------------------------------------------------------------------------
 # Web search  (DuckDuckGo, no API key needed)
 # ---------------------------------------------------------------------------
+@_cached_search("ddg")
 def search_web(query: str, max_results: int = 5) -> list[dict]:
     """DuckDuckGo text search.  Returns [{title, snippet, url}, ...]."""
     try:
@@ -57,6 +154,207 @@ def download_image(url: str, dest: str = "temp/downloaded.jpg") -> Optional[str]
         return None
 
 
+# ---------------------------------------------------------------------------
+# Concurrent candidate race  (auto-generate photo step)
+# ---------------------------------------------------------------------------
+def _cache_path(url: str) -> Path:
+    return IMG_CACHE / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".img")
+
+
+def _fetch_image_bytes(url: str, deadline: float, cancel: threading.Event) -> Optional[bytes]:
+    """Download *url* into memory; gives up on cancel, deadline or oversize.
+
+    Served from IMG_CACHE when present; waits for a running prefetch of the same URL.
+    """
+    cached = _cache_path(url)
+    if cached.exists():
+        return cached.read_bytes()
+    with _prefetch_lock:
+        pending = _prefetching.get(url)
+    if pending is not None:
+        try:
+            pending.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception:
+            pass
+        if cached.exists():
+            return cached.read_bytes()
+    return _download_bytes(url, deadline, cancel)
+
+
+def _download_bytes(url: str, deadline: float, cancel: threading.Event) -> Optional[bytes]:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    resp = requests.get(url, timeout=min(15, remaining), stream=True,
+                        headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        resp.raise_for_status()
+        if "image" not in resp.headers.get("content-type", ""):
+            return None
+        buf = bytearray()
+        for chunk in resp.iter_content(65536):
+            if cancel.is_set() or time.monotonic() > deadline:
+                return None
+            buf.extend(chunk)
+            if len(buf) > MAX_IMAGE_BYTES:
+                return None
+        return bytes(buf)
+    finally:
+        resp.close()
+
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="img-prefetch")
+_prefetch_lock = threading.Lock()
+_prefetching: dict[str, Future] = {}
+_prefetch_stats = {"stored": 0}
+
+
+def _prefetch_one(url: str, min_side: int):
+    try:
+        data = _download_bytes(url, time.monotonic() + 15, threading.Event())
+        size = _image_size(data) if data else None
+        if size is None or min(size) < min_side:
+            return
+        path = _cache_path(url)
+        IMG_CACHE.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.part")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with _prefetch_lock:
+            _prefetch_stats["stored"] += 1
+    except Exception as exc:
+        print(f"[prefetch] {url[:80]}: {exc}")
+    finally:
+        with _prefetch_lock:
+            _prefetching.pop(url, None)
+
+
+def prefetch_images(urls: list[str], min_side: int = MIN_IMAGE_SIDE) -> int:
+    """Start background downloads of *urls* into IMG_CACHE (e.g. a search's image list
+    while the LLM is still picking). Returns how many were queued."""
+    queued = 0
+    for url in dict.fromkeys(u for u in urls if u):
+        if _cache_path(url).exists():
+            continue
+        with _prefetch_lock:
+            if url in _prefetching:
+                continue
+            _prefetching[url] = _prefetch_pool.submit(_prefetch_one, url, min_side)
+        queued += 1
+    return queued
+
+
+def _image_size(data: bytes) -> Optional[tuple[int, int]]:
+    """(width, height) if *data* decodes as an image, else None."""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            w, h = img.size
+            img.draft("RGB", (max(1, w // 8), max(1, h // 8)))   # JPEG: cheap reduced decode
+            img.load()
+        return w, h
+    except Exception:
+        return None
+
+
+def card_fit_score(width: int, height: int) -> float:
+    """Share of a 1080×1350 card the image fills at native resolution after the centre crop.
+
+    Combines resolution and aspect ratio: a wide 1920×1080 photo keeps only an
+    864×1080 portrait slice, so it scores below a native 1080×1350 portrait.
+    """
+    target = CARD_W / CARD_H
+    if width / height > target:
+        usable = height * target * height
+    else:
+        usable = width * width / target
+    return min(1.0, usable / (CARD_W * CARD_H))
+
+
+def race_images(urls: list[str], dest: str, deadline: float = IMAGE_RACE_DEADLINE,
+                min_side: int = MIN_IMAGE_SIDE, preferred: int = 1) -> Optional[dict]:
+    """Download candidate images concurrently and keep the best one as *dest*.
+
+    Every candidate must decode and have a shorter side ≥ *min_side*.  The first
+    *preferred* URLs (the AI's own pick) win whenever they are acceptable; after
+    that, the first candidate that fills the card at full resolution wins
+    immediately, otherwise the best-scoring one when all finish or the shared
+    deadline passes.  In-flight losers are cancelled; finished, acceptable
+    losers are kept in IMG_CACHE so a retry doesn't download them again.
+
+    Returns {path, url, width, height, score, bytes, tried, accepted, cached} or None.
+    """
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return None
+    t_end = time.monotonic() + deadline
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="img-race")
+    futures = {pool.submit(_fetch_image_bytes, url, t_end, cancel): i for i, url in enumerate(urls)}
+    accepted: dict[int, tuple[float, int, int, bytes]] = {}   # index → (score, w, h, data)
+    pending = set(futures)
+    winner = None
+
+    try:
+        while pending and winner is None:
+            timeout = t_end - time.monotonic()
+            if timeout <= 0:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i = futures[fut]
+                try:
+                    data = fut.result()
+                except Exception as exc:
+                    print(f"[race_images] {urls[i][:80]}: {exc}")
+                    continue
+                size = _image_size(data) if data else None
+                if size is None or min(size) < min_side:
+                    continue
+                accepted[i] = (card_fit_score(*size), size[0], size[1], data)
+
+            preferred_open = any(futures[f] < preferred for f in pending)
+            for i in sorted(accepted):
+                if i < preferred:
+                    winner = i                                   # AI pick is good enough
+                    break
+                if not preferred_open and accepted[i][0] >= 1.0:
+                    winner = i                                   # fills the card — stop waiting
+                    break
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if winner is None and accepted:
+        winner = max(accepted, key=lambda i: (accepted[i][0], -i))
+    if winner is None:
+        return None
+
+    score, w, h, data = accepted[winner]
+    Path(dest).parent.mkdir(parents=True, exist_ok=True)
+    with open(dest, "wb") as f:
+        f.write(data)
+
+    cached = 0
+    for i, (_, _, _, extra) in accepted.items():
+        path = _cache_path(urls[i])
+        if i == winner or path.exists():
+            continue
+        try:
+            IMG_CACHE.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.part")
+            tmp.write_bytes(extra)
+            os.replace(tmp, path)
+            cached += 1
+        except OSError as exc:
+            print(f"[race_images] cache write failed: {exc}")
+
+    return {"path": dest, "url": urls[winner], "width": w, "height": h,
+            "score": round(score, 3), "bytes": len(data), "tried": len(urls),
+            "accepted": len(accepted), "cached": cached}
+
+
 # ---------------------------------------------------------------------------
 # Placeholder image  (dark gradient — used when no photo is available)
 # ---------------------------------------------------------------------------
@@ -79,6 +377,7 @@ def create_placeholder(dest: str = "temp/placeholder.jpg") -> str:
 # ---------------------------------------------------------------------------
 # Tavily search  (needs TAVILY_API_KEY)
 # ---------------------------------------------------------------------------
+@_cached_search("tavily")
 def search_tavily(query: str, max_results: int = 5) -> dict:
     """Tavily search with images.  Returns {results:[…], images:[…]} or {error:…}."""
     try:
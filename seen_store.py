@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Persistent news dedupe — canonical URLs in SQLite (data/seen_urls.db) with a TTL.
+
+Replaces the in-memory `seen` sets, which grew forever and were empty again
+after every restart (so the bot re-translated and re-sent old stories).  URLs
+are canonicalised first — scheme, `www.`, fragments, trailing slashes and
+utm_* / click-id parameters don't make a story "new".  Lookups are primary-key
+probes; rows expire after `ttl_days` and the table is capped at `max_entries`
+(oldest first), so disk use is bounded and process memory is constant.
+
+Usage:
+    from seen_store import SeenUrls
+    seen = SeenUrls("rss")
+    if url not in seen:
+        seen.add(url)
+    seen.stats()        # {checks, hits, hit_rate, adds, entries}
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+DATA_DIR = Path(__file__).parent / "data"
+DB_FILE  = DATA_DIR / "seen_urls.db"
+
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid", "_ga",
+    "ref", "ref_src", "cmpid", "ocid", "at_medium", "at_campaign", "at_custom1", "at_custom2",
+    "ns_mchannel", "ns_source", "ns_campaign", "ns_linkname", "ns_fee", "ito", "spm",
+}
+
+
+def canonical_url(url: str) -> str:
+    """Scheme-less, lower-case host without www., no fragment / tracking params, sorted query."""
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return url.lower()
+    if not host:
+        return url.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/")
+    return host + path + ("?" + urlencode(query) if query else "")
+
+
+class SeenUrls:
+    """Set-like (`in` / add) view of one namespace of the seen-URL table."""
+
+    def __init__(self, namespace: str, path: Path = DB_FILE, ttl_days: float = 30,
+                 max_entries: int = 100_000):
+        self.namespace = namespace
+        self.path = Path(path)
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "hits": 0, "adds": 0}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._conn()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " ns TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " added REAL NOT NULL,"
+            " expires REAL NOT NULL,"
+            " PRIMARY KEY (ns, url)) WITHOUT ROWID"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS seen_expires ON seen(ns, expires)")
+        self.sweep()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 objects aren't shareable across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, field: str):
+        with self._lock:
+            self._stats[field] += 1
+            return self._stats[field]
+
+    def __contains__(self, url: str) -> bool:
+        self._count("checks")
+        row = self._conn().execute(
+            "SELECT 1 FROM seen WHERE ns = ? AND url = ? AND expires > ?",
+            (self.namespace, canonical_url(url), time.time()),
+        ).fetchone()
+        if row is not None:
+            self._count("hits")
+        return row is not None
+
+    def add(self, url: str, ttl_s: Optional[float] = None):
+        """Mark *url* seen for the store's TTL (or *ttl_s* seconds)."""
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO seen (ns, url, added, expires) VALUES (?, ?, ?, ?)",
+            (self.namespace, canonical_url(url), now, now + (self.ttl if ttl_s is None else ttl_s)),
+        )
+        if self._count("adds") % 200 == 0:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Drop expired rows, then the oldest rows beyond max_entries."""
+        db = self._conn()
+        removed = db.execute("DELETE FROM seen WHERE ns = ? AND expires <= ?",
+                             (self.namespace, time.time())).rowcount
+        (count,) = db.execute("SELECT COUNT(*) FROM seen WHERE ns = ?", (self.namespace,)).fetchone()
+        if count > self.max_entries:
+            removed += db.execute(
+                "DELETE FROM seen WHERE ns = ? AND url IN ("
+                " SELECT url FROM seen WHERE ns = ? ORDER BY added ASC LIMIT ?)",
+                (self.namespace, self.namespace, count - self.max_entries),
+            ).rowcount
+        return removed
+
+    def __len__(self) -> int:
+        (count,) = self._conn().execute(
+            "SELECT COUNT(*) FROM seen WHERE ns = ? AND expires > ?", (self.namespace, time.time())
+        ).fetchone()
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["hit_rate"] = round(s["hits"] / s["checks"], 3) if s["checks"] else 0.0
+        s["entries"] = len(self)
+        return s
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Speculative precompute for news awaiting approval.
+
+As soon as an article reaches the admin (or the top of the RSS queue), a
+background job downloads its image, renders the card and — budget permitting
+— drafts the Facebook caption.  When the admin approves, the finished result
+is taken and published straight away; if the job is still running, approval
+simply joins it instead of starting over.  Rejected or evicted work is thrown
+away (running jobs cancelled, their files deleted through `cleanup`).
+
+Budgets: at most `max_concurrent` jobs run at once, at most `max_entries`
+results are kept (oldest evicted, and anything older than `max_age_s`), and
+LLM calls made by jobs draw from a token bucket of `llm_per_hour` — when it is
+empty the job skips the caption and approval generates it as before.
+
+Usage:
+    from speculation import Speculator
+    spec = Speculator(cleanup=lambda res: Path(res["card_path"]).unlink(missing_ok=True))
+    spec.start(article["url"], lambda allow_llm: prepare(article, allow_llm))
+    result = await spec.take(article["url"])     # None → nothing speculated / job failed
+    spec.discard(article["url"])                 # on reject
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from llm_gateway import TokenBucket
+from metrics import counter
+
+SPECULATION = counter("speculation_events", "Speculative precompute outcomes", ["event"])
+
+
+class Speculator:
+    """Keyed background jobs with concurrency, retention and LLM budgets."""
+
+    def __init__(self, max_concurrent: int = 2, max_entries: int = 30, max_age_s: float = 12 * 3600,
+                 llm_per_hour: float = 30, cleanup: Optional[Callable[[dict], None]] = None):
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self.cleanup = cleanup
+        self._sem = asyncio.Semaphore(max_concurrent)
+        self._llm = TokenBucket(rate=llm_per_hour / 3600, burst=max(1.0, llm_per_hour / 6))
+        self._jobs: "OrderedDict[str, tuple[float, asyncio.Task]]" = OrderedDict()
+        self._stats = {"started": 0, "hits": 0, "joined": 0, "misses": 0, "failed": 0,
+                       "discarded": 0, "evicted": 0, "llm_denied": 0}
+
+    def _count(self, event: str):
+        self._stats[event] += 1
+        SPECULATION.inc(event=event)
+
+    def allow_llm(self) -> bool:
+        """Take one LLM call from the speculation budget (non-blocking)."""
+        if self._llm.acquire(timeout=0):
+            return True
+        self._count("llm_denied")
+        return False
+
+    async def _run(self, job: Callable[[Callable[[], bool]], Awaitable[dict]]) -> dict:
+        async with self._sem:
+            return await job(self.allow_llm)
+
+    def start(self, key: str, job: Callable[[Callable[[], bool]], Awaitable[dict]]) -> bool:
+        """Begin speculating for *key* unless it already is. Must be called on the event loop."""
+        if not key or key in self._jobs:
+            return False
+        now = time.time()
+        while self._jobs:
+            oldest_key, (started, _) = next(iter(self._jobs.items()))
+            if len(self._jobs) < self.max_entries and now - started < self.max_age_s:
+                break
+            self._drop(oldest_key)
+            self._count("evicted")
+        self._jobs[key] = (now, asyncio.create_task(self._run(job)))
+        self._count("started")
+        return True
+
+    async def take(self, key: str) -> Optional[dict]:
+        """Claim the result for *key* (waiting for a running job); None if there is none."""
+        entry = self._jobs.pop(key, None)
+        if entry is None:
+            self._count("misses")
+            return None
+        task = entry[1]
+        self._count("hits" if task.done() else "joined")
+        try:
+            return await task
+        except Exception as exc:
+            print(f"[Speculate] Job for {key[:60]} failed: {exc}")
+            self._count("failed")
+            return None
+
+    def _drop(self, key: str):
+        entry = self._jobs.pop(key, None)
+        if entry is None:
+            return
+        task = entry[1]
+        if not task.done():
+            task.cancel()
+            task.add_done_callback(self._cleanup_task)
+        else:
+            self._cleanup_task(task)
+
+    def _cleanup_task(self, task: asyncio.Task):
+        if task.cancelled() or task.exception() is not None or self.cleanup is None:
+            return
+        try:
+            self.cleanup(task.result())
+        except Exception as exc:
+            print(f"[Speculate] Cleanup failed: {exc}")
+
+    def discard(self, key: str):
+        """Throw away speculative work for *key* (e.g. the admin rejected it)."""
+        if key in self._jobs:
+            self._drop(key)
+            self._count("discarded")
+
+    def results(self) -> list[dict]:
+        """Finished results still held (for janitor protection)."""
+        return [t.result() for _, t in self._jobs.values()
+                if t.done() and not t.cancelled() and t.exception() is None]
+
+    def stats(self) -> dict:
+        running = sum(1 for _, t in self._jobs.values() if not t.done())
+        return {**self._stats, "running": running, "ready": len(self._jobs) - running}
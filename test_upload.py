@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
 """
-Tests for photo upload endpoints:
+Tests for photo upload endpoints and dashboard serving:
   POST /api/generate      — upload photo + name + text → card
   POST /api/upload-library — upload photo to library
   GET  /api/library       — list library photos
   POST /api/delete-library — delete photo from library
   POST /api/rename-library — rename photo in library
+  GET  /                  — precompressed dashboard (gzip/br + ETag)
+  GET  /metrics           — Prometheus exposition
+  POST /api/auto-generate — SSE pipeline + GET /api/traces
 
 Uses FastAPI TestClient with mocked CardGenerator to avoid Playwright.
 """
 
 import io
 import shutil
+import time
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -24,14 +28,23 @@ from PIL import Image
 # ---------------------------------------------------------------------------
 
 # Create a tiny valid JPEG in memory for test uploads
-def _make_test_jpeg(width=100, height=100) -> bytes:
-    img = Image.new("RGB", (width, height), color=(255, 0, 0))
+def _make_test_jpeg(width=100, height=100, color=(255, 0, 0)) -> bytes:
+    img = Image.new("RGB", (width, height), color=color)
     buf = io.BytesIO()
     img.save(buf, format="JPEG")
     buf.seek(0)
     return buf.read()
 
 
+def _make_gradient_jpeg(width=200, height=200, quality=90) -> bytes:
+    """Textured image (non-trivial perceptual hash) for duplicate-detection tests."""
+    img = Image.linear_gradient("L").rotate(30).resize((width, height)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    buf.seek(0)
+    return buf.read()
+
+
 def _make_test_png(width=100, height=100) -> bytes:
     img = Image.new("RGB", (width, height), color=(0, 0, 255))
     buf = io.BytesIO()
@@ -53,13 +66,20 @@ def isolated_dirs(tmp_path, monkeypatch):
     cards.mkdir()
     uploads.mkdir()
 
+    import photo_index
     import web_app
+    monkeypatch.setattr(photo_index, "DATA_DIR", tmp_path / "data")   # keep data/photo_index-*.json untouched
     monkeypatch.setattr(web_app, "PHOTOS", photos)
     monkeypatch.setattr(web_app, "CARDS", cards)
     monkeypatch.setattr(web_app, "UPLOADS", uploads)
 
-    # Clear history between tests
-    web_app.history.clear()
+    # Fresh history store per test (keeps data/history.db untouched)
+    from history_store import HistoryStore
+    monkeypatch.setattr(web_app, "history", HistoryStore(tmp_path / "history.db"))
+    from news_queue import NewsQueue
+    monkeypatch.setattr(web_app, "_rss_queue", NewsQueue(tmp_path / "rss_queue.json"))
+    from pending_store import PendingStore
+    monkeypatch.setattr(web_app, "_pending_news", PendingStore(tmp_path / "pending.db"))
 
     yield {"photos": photos, "cards": cards, "uploads": uploads}
 
@@ -87,6 +107,46 @@ def mock_git(monkeypatch):
     yield
 
 
+@pytest.fixture()
+def etag_server():
+    """Local HTTP server factory: serve(body, etag) → (base_url, seen If-None-Match headers).
+
+    Answers 304 when the request carries the ETag, otherwise 200 with the body.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    servers = []
+
+    def serve(body: bytes, etag: str):
+        seen = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                seen.append(self.headers.get("If-None-Match"))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", seen
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+
+
 @pytest.fixture()
 def client():
     """FastAPI TestClient."""
@@ -174,9 +234,9 @@ class TestApiGenerate:
         assert "no photo" in resp.json()["error"].lower()
 
     def test_generate_duplicate_name_gets_suffix(self, client, isolated_dirs):
-        """Uploading two photos with the same name should not overwrite."""
+        """Uploading two different photos with the same name should not overwrite."""
         jpeg1 = _make_test_jpeg(80, 80)
-        jpeg2 = _make_test_jpeg(90, 90)
+        jpeg2 = _make_test_jpeg(90, 90, color=(0, 128, 0))
 
         client.post(
             "/api/generate",
@@ -196,6 +256,17 @@ class TestApiGenerate:
         assert "Duplicate" in names
         assert "Duplicate_1" in names
 
+    def test_generate_reuses_duplicate_library_photo(self, client, isolated_dirs):
+        """Uploading a photo already in the library links it instead of copying."""
+        (isolated_dirs["photos"] / "known.jpg").write_bytes(_make_gradient_jpeg())
+        resp = client.post(
+            "/api/generate",
+            data={"name": "Someone Else", "text": "Text"},
+            files={"photo": ("x.jpg", io.BytesIO(_make_gradient_jpeg()), "image/jpeg")},
+        )
+        assert resp.status_code == 200
+        assert [f.name for f in isolated_dirs["photos"].iterdir()] == ["known.jpg"]
+
     def test_generate_special_chars_in_name(self, client, isolated_dirs):
         """Filesystem-unsafe chars in name are stripped."""
         jpeg_bytes = _make_test_jpeg()
@@ -291,9 +362,9 @@ class TestApiUploadLibrary:
         assert (isolated_dirs["photos"] / "myphoto.jpg").exists()
 
     def test_upload_duplicate_gets_suffix(self, client, isolated_dirs):
-        """Uploading the same filename twice should auto-increment."""
+        """Uploading two different photos under the same filename should auto-increment."""
         jpeg1 = _make_test_jpeg(80, 80)
-        jpeg2 = _make_test_jpeg(90, 90)
+        jpeg2 = _make_test_jpeg(90, 90, color=(0, 128, 0))
 
         resp1 = client.post(
             "/api/upload-library",
@@ -312,6 +383,99 @@ class TestApiUploadLibrary:
         saved = sorted(isolated_dirs["photos"].iterdir())
         assert len(saved) == 2
 
+    def test_upload_same_photo_is_linked(self, client, isolated_dirs):
+        """Re-uploading an identical photo returns the existing library entry."""
+        jpeg = _make_gradient_jpeg()
+        resp1 = client.post(
+            "/api/upload-library",
+            files={"photo": ("orig.jpg", io.BytesIO(jpeg), "image/jpeg")},
+        )
+        resp2 = client.post(
+            "/api/upload-library",
+            files={"photo": ("copy.jpg", io.BytesIO(jpeg), "image/jpeg")},
+        )
+        assert resp2.status_code == 200
+        body = resp2.json()
+        assert body["duplicate"] is True
+        assert body["url"] == resp1.json()["url"]
+        assert len(list(isolated_dirs["photos"].iterdir())) == 1
+
+    def test_upload_near_duplicate_is_linked(self, client, isolated_dirs):
+        """A resized / recompressed copy is detected by perceptual hash."""
+        resp1 = client.post(
+            "/api/upload-library",
+            files={"photo": ("big.jpg", io.BytesIO(_make_gradient_jpeg(400, 400)), "image/jpeg")},
+        )
+        assert resp1.status_code == 200 and resp1.json()["duplicate"] is False
+        resp2 = client.post(
+            "/api/upload-library",
+            files={"photo": ("small.jpg", io.BytesIO(_make_gradient_jpeg(150, 150, quality=40)), "image/jpeg")},
+        )
+        assert resp2.json()["duplicate"] is True
+        assert resp2.json()["name"] == "big"
+        assert len(list(isolated_dirs["photos"].iterdir())) == 1
+
+    def test_upload_higher_resolution_copy_replaces_original(self, client, isolated_dirs):
+        """A near-duplicate with more pixels upgrades the library file in place."""
+        client.post(
+            "/api/upload-library",
+            files={"photo": ("small.jpg", io.BytesIO(_make_gradient_jpeg(150, 150)), "image/jpeg")},
+        )
+        resp = client.post(
+            "/api/upload-library",
+            files={"photo": ("big.jpg", io.BytesIO(_make_gradient_jpeg(400, 400)), "image/jpeg")},
+        )
+        body = resp.json()
+        assert body["replaced"] is True and body["name"] == "small"
+        assert [f.name for f in isolated_dirs["photos"].iterdir()] == ["small.jpg"]
+        with Image.open(isolated_dirs["photos"] / "small.jpg") as img:
+            assert img.size == (400, 400)
+
+    def test_upload_too_large_returns_413(self, client, isolated_dirs, monkeypatch):
+        """Uploads above MAX_UPLOAD_BYTES are rejected and leave no temp file."""
+        import web_app
+        monkeypatch.setattr(web_app, "MAX_UPLOAD_BYTES", 1024)
+        resp = client.post(
+            "/api/upload-library",
+            files={"photo": ("huge.jpg", io.BytesIO(_make_gradient_jpeg(400, 400)), "image/jpeg")},
+        )
+        assert resp.status_code == 413
+        assert list(isolated_dirs["photos"].iterdir()) == []
+        assert list((isolated_dirs["uploads"] / "tmp").iterdir()) == []   # staging, not /photos
+
+    def test_upload_rejected_from_content_length(self, client, isolated_dirs, monkeypatch):
+        """An oversized Content-Length is refused before the body reaches the endpoint."""
+        import web_app
+        monkeypatch.setattr(web_app, "MAX_UPLOAD_BYTES", 1024)
+        monkeypatch.setattr(web_app, "_MULTIPART_OVERHEAD", 0)
+        monkeypatch.setattr(web_app, "_receive_upload", MagicMock(side_effect=AssertionError))
+        resp = client.post(
+            "/api/generate",
+            data={"name": "Big", "text": "Text"},
+            files={"photo": ("huge.jpg", io.BytesIO(_make_gradient_jpeg(400, 400)), "image/jpeg")},
+        )
+        assert resp.status_code == 413
+        assert list(isolated_dirs["photos"].iterdir()) == []
+
+    def test_upload_non_image_returns_400(self, client, isolated_dirs):
+        """Files that don't start with a JPEG/PNG/WebP header are rejected."""
+        resp = client.post(
+            "/api/upload-library",
+            files={"photo": ("notes.jpg", io.BytesIO(b"just some text, not a photo"), "image/jpeg")},
+        )
+        assert resp.status_code == 400
+        assert list(isolated_dirs["photos"].iterdir()) == []
+
+    def test_upload_truncated_image_returns_400(self, client, isolated_dirs):
+        """A valid header with a corrupt body fails validation."""
+        broken = _make_test_png()[:40]
+        resp = client.post(
+            "/api/upload-library",
+            files={"photo": ("broken.png", io.BytesIO(broken), "image/png")},
+        )
+        assert resp.status_code == 400
+        assert list(isolated_dirs["photos"].iterdir()) == []
+
     def test_upload_spaces_replaced_with_underscores(self, client, isolated_dirs):
         """Spaces in filename are replaced with underscores."""
         jpeg_bytes = _make_test_jpeg()
@@ -552,6 +716,40 @@ class TestApiStatus:
         assert "telegram" in body
         assert "cards" in body
 
+    def test_metrics_exposition(self, client):
+        """/metrics serves Prometheus text with the pipeline instruments."""
+        from metrics import timed_request, _endpoint_label
+        assert _endpoint_label("https://api.telegram.org/bot123:abc/sendPhoto") == "sendPhoto"
+        assert _endpoint_label("https://graph.facebook.com/v18.0/12345_678") == "node"
+        with patch("metrics.requests.request", return_value=MagicMock(status_code=200)):
+            timed_request("telegram", "POST", "https://api.telegram.org/botX/sendMessage")
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert "# TYPE rss_queue_depth gauge" in resp.text
+        assert "rss_queue_depth 0" in resp.text
+        assert 'external_request_seconds_count{api="telegram",endpoint="sendMessage",status="200"}' in resp.text
+        assert 'le="+Inf"' in resp.text
+
+    def test_metrics_types_name_their_samples(self, client):
+        """Every sample belongs to a family declared by a TYPE line (strict 0.0.4 parsers)."""
+        import re
+        from metrics import counter
+        counter("test_exposition_events", "test counter").inc()
+        types, samples = {}, []
+        for line in client.get("/metrics").text.splitlines():
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split()
+                types[name] = kind
+            elif line and not line.startswith("#"):
+                samples.append(re.match(r"[a-zA-Z_:][a-zA-Z0-9_:]*", line).group())
+        assert types["test_exposition_events_total"] == "counter"
+        for name in samples:
+            family = name if name in types else re.sub(r"_(bucket|sum|count)$", "", name)
+            assert family in types, name
+            if family != name:
+                assert types[family] == "histogram", name
+
 
 # ===========================================================================
 # GET /api/history
@@ -580,3 +778,814 @@ class TestApiHistory:
         # Most recent first
         assert hist[0]["name"] == "Person2"
         assert hist[2]["name"] == "Person0"
+
+    def test_history_cursor_pagination(self, client):
+        """?before=<id>&limit= pages back through older entries."""
+        import web_app
+        for i in range(5):
+            web_app._add_history(f"Card{i}", f"/cards/{i}_card.jpg")
+
+        page1 = client.get("/api/history", params={"limit": 2}).json()
+        assert [h["name"] for h in page1] == ["Card4", "Card3"]
+        page2 = client.get("/api/history", params={"limit": 2, "before": page1[-1]["id"]}).json()
+        assert [h["name"] for h in page2] == ["Card2", "Card1"]
+        page3 = client.get("/api/history", params={"limit": 2, "before": page2[-1]["id"]}).json()
+        assert [h["name"] for h in page3] == ["Card0"]
+
+    def test_history_is_bounded(self, tmp_path):
+        """The store keeps only the newest `capacity` entries."""
+        from history_store import HistoryStore
+        store = HistoryStore(tmp_path / "h.db", capacity=3)
+        for i in range(10):
+            store.add(f"n{i}", f"/cards/{i}.jpg")
+        assert len(store) == 3
+        assert [h["name"] for h in store.page()] == ["n9", "n8", "n7"]
+
+
+# ===========================================================================
+# GET / — precompressed dashboard
+# ===========================================================================
+class TestDashboard:
+    """Tests for GET / (precompressed, ETag-validated dashboard)."""
+
+    def test_dashboard_gzip_and_etag(self, client):
+        """Gzip-capable clients get the precompressed body and a strong ETag."""
+        resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert resp.headers["etag"].startswith('"')
+        assert "News Card Bot" in resp.text
+
+    def test_dashboard_not_modified(self, client):
+        """A matching If-None-Match returns 304 with no body."""
+        etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+        resp = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+
+    def test_dashboard_identity(self, client):
+        """Clients without compression support get the plain HTML."""
+        resp = client.get("/", headers={"Accept-Encoding": "identity"})
+        assert resp.status_code == 200
+        assert "content-encoding" not in resp.headers
+
+
+# ===========================================================================
+# Static mounts — Cache-Control, content ETags, ranges
+# ===========================================================================
+class TestCachedStaticFiles:
+    """Tests for http_cache.CachedStaticFiles on a throwaway app."""
+
+    @pytest.fixture()
+    def static_client(self, tmp_path, monkeypatch):
+        import asyncio
+        import hashlib
+        import types
+        import http_cache
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        hashed_on_loop = []            # one entry per file actually hashed
+
+        def sha256(*args):
+            try:
+                asyncio.get_running_loop()
+                hashed_on_loop.append(True)
+            except RuntimeError:
+                hashed_on_loop.append(False)
+            return hashlib.sha256(*args)
+
+        monkeypatch.setattr(http_cache, "hashlib", types.SimpleNamespace(sha256=sha256))
+        lib, gen = tmp_path / "lib_photos", tmp_path / "gen_cards"
+        lib.mkdir()
+        gen.mkdir()
+        (lib / "a.jpg").write_bytes(_make_gradient_jpeg())
+        (gen / "c.jpg").write_bytes(b"0123456789")
+        app = FastAPI()
+        app.mount("/photos", http_cache.CachedStaticFiles(
+            directory=str(lib), cache_control=http_cache.REVALIDATE, strong_etag=True))
+        app.mount("/cards", http_cache.CachedStaticFiles(
+            directory=str(gen), cache_control=http_cache.IMMUTABLE))
+        return TestClient(app), hashed_on_loop
+
+    def test_etag_revalidation_and_counters(self, static_client):
+        """A matching If-None-Match is a 304 hit; the hash is computed off the loop thread."""
+        import http_cache
+        client, hashed_on_loop = static_client
+        first = client.get("/photos/a.jpg")
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == http_cache.REVALIDATE
+        second = client.get("/photos/a.jpg", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 304 and second.content == b""
+        assert http_cache.cache_stats()["lib_photos"] == {
+            "hits": 1, "misses": 1, "partial": 0, "hit_rate": 0.5}
+        assert hashed_on_loop == [False]                # hashed once, in a worker thread
+
+    def test_immutable_and_range(self, static_client):
+        """Generated files are immutable; Range requests get a 206 and count as partial."""
+        import http_cache
+        client, _ = static_client
+        full = client.get("/cards/c.jpg")
+        assert full.headers["cache-control"] == "public, max-age=31536000, immutable"
+        part = client.get("/cards/c.jpg", headers={"Range": "bytes=2-5"})
+        assert part.status_code == 206 and part.content == b"2345"
+        assert http_cache.cache_stats()["gen_cards"]["partial"] == 1
+
+
+# ===========================================================================
+# Startup photo sync from GitHub
+# ===========================================================================
+class TestLibrarySync:
+    """Tests for _sync_photos_from_github with git subprocesses faked."""
+
+    @pytest.fixture()
+    def git_calls(self, monkeypatch):
+        import subprocess
+        import web_app
+        monkeypatch.setenv("RAILWAY_ENVIRONMENT", "test")
+        monkeypatch.setenv("GITHUB_TOKEN", "t")
+        monkeypatch.setattr(web_app, "_library_sync", dict(web_app._library_sync, state="idle"))
+        calls, failing = [], set()
+
+        def fake_run(cmd, **kw):
+            calls.append((cmd[1:], kw.get("input")))
+            for prefix in failing:
+                if " ".join(cmd[1:]).startswith(prefix):
+                    raise subprocess.CalledProcessError(1, cmd, stderr=f"{prefix}: boom".encode())
+            out = b"photos/old.jpg\0photos/fresh.jpg\0" if cmd[1] == "ls-tree" else b""
+            return subprocess.CompletedProcess(cmd, 0, stdout=out, stderr=b"")
+
+        monkeypatch.setattr(subprocess, "run", fake_run)
+        return calls, failing
+
+    def test_skipped_without_railway(self, monkeypatch):
+        """Outside Railway the sync is skipped and reported as such."""
+        import web_app
+        monkeypatch.delenv("RAILWAY_ENVIRONMENT", raising=False)
+        monkeypatch.setattr(web_app, "_library_sync", dict(web_app._library_sync, state="idle"))
+        web_app._sync_photos_from_github()
+        assert web_app._library_sync["state"] == "skipped"
+
+    def test_partial_fetch_fallback_keeps_fresh_uploads(self, git_calls, isolated_dirs):
+        """A failed blob-less fetch falls back to a plain one; files written during the sync survive."""
+        import os
+        import time
+        import web_app
+        calls, failing = git_calls
+        failing.add("fetch --depth=1 --filter=blob:none")
+        (isolated_dirs["photos"] / "old.jpg").write_bytes(_make_test_jpeg())
+        os.utime(isolated_dirs["photos"] / "old.jpg", (time.time() - 3600,) * 2)
+        (isolated_dirs["photos"] / "fresh.jpg").write_bytes(_make_test_jpeg())
+        os.utime(isolated_dirs["photos"] / "fresh.jpg", (time.time() + 60,) * 2)
+
+        web_app._sync_photos_from_github()
+        fetches = [c for c, _ in calls if c[0] == "fetch"]
+        assert "--filter=blob:none" in fetches[0] and "--filter=blob:none" not in fetches[1]
+        checkout = [(c, inp) for c, inp in calls if c[0] == "checkout"]
+        assert checkout == [(["checkout", "origin/main", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                             b"photos/old.jpg")]
+        assert web_app._library_sync["state"] == "done"
+        assert web_app._library_sync["photos"] == 2
+
+    def test_failed_checkout_reports_error(self, git_calls):
+        """A git failure leaves state "failed" with the stderr tail."""
+        import web_app
+        _, failing = git_calls
+        failing.add("checkout")
+        web_app._sync_photos_from_github()
+        assert web_app._library_sync["state"] == "failed"
+        assert "checkout: boom" in web_app._library_sync["error"]
+        assert web_app._library_sync["step"] is None
+
+
+# ===========================================================================
+# Storage janitor — age expiry, LRU byte quota, protection
+# ===========================================================================
+class TestJanitor:
+    """Tests for janitor.sweep_dir / sweep over a tmp directory with controlled mtimes."""
+
+    @staticmethod
+    def _file(directory, name, size, age_s):
+        import os
+        import time
+        path = directory / name
+        path.write_bytes(b"x" * size)
+        t = time.time() - age_s
+        os.utime(path, (t, t))
+        return str(path.resolve())
+
+    def test_age_expiry_and_lru_quota(self, tmp_path):
+        """Expired files go first, then least-recently-used until the quota fits."""
+        import janitor
+        directory = tmp_path / "swept"
+        directory.mkdir()
+        old = self._file(directory, "old.jpg", 100, 10 * 86400)
+        a = self._file(directory, "a.jpg", 100, 3000)
+        b = self._file(directory, "b.jpg", 100, 2000)
+        c = self._file(directory, "c.jpg", 100, 1000)
+        res = janitor.sweep_dir(directory, max_bytes=200, max_age=86400, protected=set())
+        assert res == {"reclaimed_bytes": 200, "reclaimed_files": 2, "bytes": 200, "files": 2}
+        assert sorted(p.name for p in directory.iterdir()) == ["b.jpg", "c.jpg"]
+        assert not Path(old).exists() and not Path(a).exists()
+        assert Path(b).exists() and Path(c).exists()
+
+    def test_protected_and_recently_served_files_survive(self, tmp_path):
+        """Protected paths are never deleted; record_access() makes a file most-recently-used."""
+        import janitor
+        directory = tmp_path / "swept"
+        directory.mkdir()
+        keep = self._file(directory, "keep.jpg", 100, 10 * 86400)
+        served = self._file(directory, "served.jpg", 100, 3000)
+        self._file(directory, "idle.jpg", 100, 1000)
+        janitor.record_access(served)
+        res = janitor.sweep({"cards": directory}, protected={keep})
+        assert res["cards"]["reclaimed_files"] == 0          # default quota: nothing over
+        janitor.sweep_dir(directory, max_bytes=200, max_age=86400, protected={keep})
+        assert sorted(p.name for p in directory.iterdir()) == ["keep.jpg", "served.jpg"]
+
+
+# ===========================================================================
+# POST /api/auto-generate — SSE pipeline tracing
+# ===========================================================================
+class TestAutoGenerate:
+    """Tests for POST /api/auto-generate with search / LLM / download mocked."""
+
+    @pytest.fixture()
+    def pipeline(self, tmp_path, monkeypatch):
+        import json
+        import search
+        import web_app
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("GEMINI_API_KEY", "test")
+        monkeypatch.setattr(search, "search_tavily",
+                            lambda q, n=5: {"results": [{"title": "t"}], "images": ["http://x/a.jpg"]})
+
+        monkeypatch.setattr(search, "_fetch_image_bytes",
+                            lambda url, deadline, cancel: _make_test_jpeg(1080, 1350))
+        monkeypatch.setattr(search, "prefetch_images", lambda urls: 0)
+        monkeypatch.setattr(web_app, "_pick_gemini",
+                            lambda res: {"name": "Story", "text": "Text", "image_url": "http://x/a.jpg"})
+        monkeypatch.setattr(web_app, "log_activity", lambda **kw: None)
+
+        def run(client):
+            resp = client.post("/api/auto-generate", data={"theme": "news"})
+            events = [json.loads(line[6:]) for line in resp.text.split("\n\n") if line.startswith("data: ")]
+            return resp, events
+        return run
+
+    def test_stage_durations_in_events_and_traces(self, client, pipeline):
+        """log/done events carry stage durations; the trace lands in /api/traces."""
+        resp, events = pipeline(client)
+        done = events[-1]
+        assert done["t"] == "done"
+        assert set(done["stages"]) == {"search", "llm", "download", "save"}
+        assert resp.headers["x-trace-id"] == done["trace_id"]
+        assert any(e.get("stage") == "search" and e["ms"] >= 0 for e in events)
+
+        body = client.get("/api/traces", params={"name": "auto_generate"}).json()
+        trace = body["traces"][0]
+        assert trace["trace_id"] == done["trace_id"]
+        assert trace["status"] == "ok"
+        assert [s["name"] for s in trace["spans"]] == ["search", "llm", "download", "save"]
+        assert trace["spans"][2]["bytes"] > 0
+        assert "p95_ms" in body["summary"]["download"]
+
+    def test_photo_race_ranks_candidates(self, tmp_path, monkeypatch):
+        """Too-small and undecodable candidates lose; the best card fit wins, extras are cached."""
+        import search
+        monkeypatch.chdir(tmp_path)
+        bodies = {
+            "http://x/tiny.jpg":  _make_test_jpeg(200, 200),
+            "http://x/broken.jpg": b"not an image",
+            "http://x/wide.jpg":  _make_test_jpeg(1600, 900),
+            "http://x/tall.jpg":  _make_test_jpeg(1080, 1350),
+        }
+        monkeypatch.setattr(search, "_fetch_image_bytes", lambda url, deadline, cancel: bodies[url])
+
+        result = search.race_images(list(bodies), "temp/out.jpg", preferred=0)
+        assert result["url"] == "http://x/tall.jpg"
+        assert (result["width"], result["height"]) == (1080, 1350)
+        assert Path("temp/out.jpg").exists()
+        assert result["cached"] == result["accepted"] - 1     # acceptable losers kept for later
+
+        # the AI's own pick wins whenever it is acceptable
+        result = search.race_images(["http://x/wide.jpg", "http://x/tall.jpg"], "temp/out2.jpg")
+        assert result["url"] == "http://x/wide.jpg"
+
+
+# ===========================================================================
+# LLM gateway — hedged fallback chain
+# ===========================================================================
+class TestLlmGateway:
+    """Tests for llm_gateway.hedged_call (no network: providers are plain callables)."""
+
+    def test_hedge_and_fallback(self, monkeypatch):
+        """A slow primary is hedged, a failing one hands over, the deadline bounds the chain."""
+        import asyncio
+        import time
+        from llm_gateway import hedged_call
+        monkeypatch.setenv("LLM_HEDGE_AFTER", "0.05")
+
+        def slow():
+            time.sleep(0.5)
+            return {"name": "slow"}
+
+        out = asyncio.run(hedged_call("pick_story", [("a", slow), ("b", lambda: {"name": "fast"})]))
+        assert out["provider"] == "b" and out["result"] == {"name": "fast"}
+        assert [a["reason"] for a in out["attempts"]] == ["primary", "hedge"]
+        assert out["elapsed"] < 0.4
+
+        out = asyncio.run(hedged_call("pick_story", [("a", lambda: {"error": "down"}),
+                                                     ("b", lambda: {"name": "ok"})]))
+        assert out["provider"] == "b"
+        assert out["attempts"][1]["reason"] == "fallback"
+
+        out = asyncio.run(hedged_call("pick_story", [("a", slow)], deadline=0.1))
+        assert out["provider"] is None and "deadline" in out["result"]["error"]
+
+    def test_circuit_breaker_opens_and_recovers(self, monkeypatch):
+        """Consecutive failures open the breaker; calls then fail fast until a probe succeeds."""
+        import asyncio
+        import time
+        import llm_gateway
+        from llm_gateway import ProviderUnavailable, guard, hedged_call, _provider
+
+        p = _provider("test_flaky")
+        p.breaker = llm_gateway.CircuitBreaker(threshold=2, cooldown=0.05)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                with guard("test_flaky"):
+                    raise RuntimeError("503")
+        assert p.breaker.state == "open"
+        with pytest.raises(ProviderUnavailable):
+            with guard("test_flaky"):
+                pytest.fail("provider must not be called while open")
+
+        # open provider is skipped instantly in a fallback chain
+        out = asyncio.run(hedged_call("pick_story", [("test_flaky", lambda: {"name": "x"}),
+                                                     ("b", lambda: {"name": "ok"})]))
+        assert out["provider"] == "b"
+        assert out["attempts"][0]["outcome"] == "circuit_open"
+
+        # ... and never launched as the last resort either
+        out = asyncio.run(hedged_call("pick_story", [("b", lambda: {"error": "down"}),
+                                                     ("test_flaky", lambda: pytest.fail("called"))]))
+        assert out["provider"] is None
+        assert out["result"]["error"] == "down (remaining providers unavailable)"
+        out = asyncio.run(hedged_call("pick_story", [("test_flaky", lambda: pytest.fail("called"))]))
+        assert out["result"]["error"] == "pick_story: all providers unavailable"
+        assert out["attempts"] == [{"provider": "test_flaky", "reason": "skipped",
+                                    "outcome": "circuit_open", "seconds": 0.0}]
+
+        time.sleep(0.06)                     # cooldown over → one half-open probe
+        with guard("test_flaky"):
+            pass
+        assert p.breaker.state == "closed"
+        assert llm_gateway.gateway_stats()["providers"]["test_flaky"]["trips"] == 1
+
+    def test_cache_hits_are_not_latency_samples(self, tmp_path):
+        """A chain answered from llm_cache wins but doesn't feed the provider's p90."""
+        import asyncio
+        import json
+        from llm_cache import LLMCache
+        from llm_gateway import hedged_call, latency
+        cache = LLMCache(tmp_path / "llm.db")
+
+        def pick():
+            raw = cache.completion("test_cached", "m", "prompt", lambda: '{"name": "x"}', ttl=60)
+            return {"name": json.loads(raw)["name"]}
+
+        for _ in range(3):
+            out = asyncio.run(hedged_call("pick_story", [("test_cached", pick)]))
+            assert out["provider"] == "test_cached"
+        assert latency.snapshot()["test_cached"]["ok"] == 1
+
+
+# ===========================================================================
+# llm_cache.py — persistent LLM response cache
+# ===========================================================================
+class TestLlmCache:
+    """Tests for the SQLite TTL + LRU cache of raw model outputs."""
+
+    def test_llm_cache_ttl_lru_and_stats(self, tmp_path):
+        """Identical prompts hit the cache; TTL, validators and the LRU bound are honoured."""
+        from llm_cache import LLMCache, has_json_object
+        cache = LLMCache(tmp_path / "llm.db", max_entries=2)
+        calls = []
+
+        def model(answer):
+            def call():
+                calls.append(answer)
+                return answer
+            return call
+
+        assert cache.completion("g", "m", "Translate  this", model('{"a":1}'), ttl=60, fn="t") == '{"a":1}'
+        assert cache.completion("g", "m", "Translate this\n", model("x"), ttl=60, fn="t") == '{"a":1}'
+        assert calls == ['{"a":1}']                              # whitespace-normalised hit
+
+        cache.completion("g", "m", "bad", model("no json"), ttl=60, valid=has_json_object)
+        cache.completion("g", "m", "bad", model("no json"), ttl=60, valid=has_json_object)
+        assert calls.count("no json") == 2                       # invalid output not cached
+        truncated = '{"title": "x", "body": "cut off}'               # braces, but not JSON
+        cache.completion("g", "m", "cut", model(truncated), ttl=60, valid=has_json_object)
+        cache.completion("g", "m", "cut", model(truncated), ttl=60, valid=has_json_object)
+        assert calls.count(truncated) == 2                       # malformed JSON not cached either
+        assert has_json_object('```json\n{"a": [1]}\n```') and not has_json_object("[1, 2]")
+
+        cache.completion("g", "m", "old", model("o"), ttl=-1)    # already expired
+        assert cache.completion("g", "m", "old", model("o2"), ttl=60) == "o2"
+
+        for i in range(5):
+            cache.completion("g", "m", f"p{i}", model(f"v{i}"), ttl=60)
+        cache.evict()
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["by_fn"]["t"] == {"hits": 1, "misses": 1, "saved_s": stats["by_fn"]["t"]["saved_s"]}
+        assert 0 < stats["hit_rate"] < 1
+
+
+# ===========================================================================
+# search.py — result cache
+# ===========================================================================
+class TestSearchCache:
+    """Tests for the TTL + single-flight search cache."""
+
+    def test_identical_queries_share_one_request(self, monkeypatch):
+        """Normalised repeats hit the cache; concurrent identical queries coalesce; errors aren't cached."""
+        import threading
+        import time
+        import search
+        calls = []
+
+        @search._cached_search("test")
+        def fake(query, max_results=5):
+            calls.append(query)
+            time.sleep(0.1)
+            return {"error": "down"} if query == "fail" else {"results": [query], "images": []}
+
+        threads = [threading.Thread(target=fake, args=("Tbilisi  News",)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert fake("tbilisi news") == {"results": ["Tbilisi  News"], "images": []}
+        assert len(calls) == 1
+
+        fake("fail")
+        fake("fail")
+        assert calls.count("fail") == 2
+
+        monkeypatch.setattr(search, "SEARCH_CACHE_TTL", -1)
+        fake("fresh")
+        fake("fresh")
+        assert calls.count("fresh") == 2
+
+
+# ===========================================================================
+# web_app.py — RSS polling and batched translation
+# ===========================================================================
+class TestRssPipeline:
+    """Tests for the conditional-GET poller and _translate_batch_to_georgian."""
+
+    def test_batch_maps_by_id_and_falls_back_per_item(self, monkeypatch, tmp_path):
+        """One request per batch; ids the model dropped are translated singly."""
+        import json
+        from types import SimpleNamespace
+        import web_app
+        from llm_cache import LLMCache
+
+        requests_sent = []
+
+        def generate_content(model, contents, config=None):
+            requests_sent.append(contents)
+            items = json.loads(contents[contents.index("[{\"id\": 0"):])
+            rows = [{"id": it["id"], "title_ka": f"ka:{it['title']}", "desc_ka": ""}
+                    for it in reversed(items) if it["id"] != 1]
+            return SimpleNamespace(text="```json\n" + json.dumps(rows) + "\n```")
+
+        fake = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+        monkeypatch.setenv("GEMINI_API_KEY", "test")
+        monkeypatch.setattr(web_app, "get_client", lambda provider, key: fake)
+        monkeypatch.setattr(web_app, "llm_cache", LLMCache(tmp_path / "llm.db"))
+        singles = []
+        monkeypatch.setattr(web_app, "_translate_to_georgian",
+                            lambda t, d: singles.append(t) or {"title_ka": f"single:{t}", "desc_ka": d})
+
+        items = [{"title": f"t{i}", "description": f"d{i}"} for i in range(3)]
+        out = web_app._translate_batch_to_georgian(items)
+
+        assert len(requests_sent) == 1
+        assert singles == ["t1"]
+        assert out == [{"title_ka": "ka:t0", "desc_ka": "d0"},
+                       {"title_ka": "single:t1", "desc_ka": "d1"},
+                       {"title_ka": "ka:t2", "desc_ka": "d2"}]
+
+    def test_conditional_get_skips_unchanged_feed(self, etag_server):
+        """The second poll sends the stored ETag; a 304 returns None and counts bytes saved."""
+        import web_app
+
+        feed = b"<rss><channel><item><title>x</title></item></channel></rss>"
+        base, seen = etag_server(feed, '"v1"')
+        source = {"url": f"{base}/feed.xml"}
+        try:
+            before = web_app._rss_poll_snapshot()
+            assert web_app._download_rss_feed(source) == feed
+            assert web_app._download_rss_feed(source) is None
+            after = web_app._rss_poll_snapshot()
+        finally:
+            web_app._rss_validators.pop(source["url"], None)
+
+        assert seen == [None, '"v1"']
+        assert after["not_modified"] - before["not_modified"] == 1
+        assert after["bytes_saved"] - before["bytes_saved"] == len(feed)
+
+    def test_adaptive_interval_tracks_publish_cadence(self):
+        """Busy feeds converge towards half their item gap; quiet polls back off to the max."""
+        import web_app
+        source = {"id": "test-cadence", "interval_min": 30}
+        try:
+            now = 1_000_000.0
+            items = [{"published": now - 600 * i} for i in range(5)]     # one item every 10 min
+            assert web_app._rss_learn_interval(source, items, now) == 5.0
+            for _ in range(40):
+                web_app._rss_learn_interval(source, [], now)
+            assert source["learned_interval_min"] == web_app._RSS_POLL_MAX
+            assert web_app._rss_poll_interval(source) == web_app._RSS_POLL_MAX * 60
+        finally:
+            web_app._rss_cadence.pop("test-cadence", None)
+
+
+# ===========================================================================
+# seen_store.py — persistent dedupe
+# ===========================================================================
+class TestSeenUrls:
+    """Tests for the persistent seen-URL store."""
+
+    def test_canonical_urls_persist_and_expire(self, tmp_path):
+        """Tracking params / scheme / www. don't make a URL new; entries survive a restart and expire."""
+        from seen_store import SeenUrls, canonical_url
+        assert canonical_url("http://www.bbc.co.uk/news/x/?utm_source=rss&b=2&a=1#top") \
+            == canonical_url("https://bbc.co.uk/news/x?a=1&b=2&fbclid=abc")
+
+        db = tmp_path / "seen.db"
+        seen = SeenUrls("rss", db)
+        seen.add("https://edition.cnn.com/story?utm_medium=feed")
+        assert "http://edition.cnn.com/story" in SeenUrls("rss", db)       # new instance, same file
+        assert "http://edition.cnn.com/story" not in SeenUrls("news", db)  # namespaces are separate
+
+        expired = SeenUrls("old", db, ttl_days=-1)
+        expired.add("https://example.com/a")
+        assert "https://example.com/a" not in expired
+
+        capped = SeenUrls("cap", db, max_entries=3)
+        for i in range(5):
+            capped.add(f"https://example.com/{i}")
+        capped.sweep()
+        assert len(capped) == 3 and "https://example.com/0" not in capped
+        assert seen.stats()["adds"] == 1
+
+
+# ===========================================================================
+# near_dup.py — same-story clustering
+# ===========================================================================
+class TestNearDup:
+    """Tests for the MinHash near-duplicate index."""
+
+    def test_clusters_same_story_across_sources_and_languages(self):
+        """Reworded copies attach to the leader; translations extend the cluster; windows expire."""
+        from near_dup import NearDupIndex
+        index = NearDupIndex(window_s=3600, threshold=0.4)
+        cnn = {"title": "Israel launches new strikes on Gaza as ceasefire talks stall",
+               "source_name": "CNN World"}
+        bbc = {"title": "Israeli strikes hit southern Gaza as Cairo ceasefire negotiations stall",
+               "source_name": "BBC News", "url": "https://bbc.co.uk/x"}
+        cnn_text = cnn["title"] + ". Israeli jets struck targets in southern Gaza overnight, " \
+            "officials said, as negotiations over a ceasefire stalled in Cairo."
+        bbc_text = bbc["title"] + ". Israeli warplanes struck southern Gaza overnight while " \
+            "talks on a ceasefire stalled."
+
+        assert index.find(cnn_text, now=0) is None
+        cid = index.add(cnn_text, cnn, now=0)
+        assert index.find(bbc_text, now=10) is cnn
+        index.attach(cnn, bbc)
+        assert cnn["also_reported_by"] == [{"source": "BBC News", "title": bbc["title"],
+                                            "url": "https://bbc.co.uk/x"}]
+        assert index.find("Apple unveils a larger iPhone battery", now=20) is None
+
+        index.extend(cid, "ისრაელმა ღაზაზე ახალი დარტყმები განახორციელა, ცეცხლის შეწყვეტის მოლაპარაკებები შეჩერდა")
+        assert index.find("ისრაელმა ღაზაზე ახალი დარტყმები განახორციელა — მოლაპარაკებები შეჩერდა", now=30) is cnn
+        assert index.find(bbc_text, now=10_000) is None                 # outside the window
+        assert index.stats()["duplicates"] == 2
+
+    def test_attribution_reaches_persisted_copies(self, monkeypatch, tmp_path):
+        """A late duplicate updates the queued / pending leader; it is only seen for the window."""
+        import web_app
+        from near_dup import NearDupIndex
+        from news_queue import NewsQueue
+        from seen_store import SeenUrls
+        monkeypatch.setattr(web_app, "_news_clusters", NearDupIndex(window_s=3600))
+        seen = SeenUrls("test", tmp_path / "seen.db")
+        text = "Parliament passes the budget after a long night of debate over spending cuts"
+        queued = {"title": text, "url": "https://a/1"}
+        pending = {"title": text, "url": "https://b/1"}
+        web_app._cluster_articles([queued, pending])      # second one is a follower → dropped
+        assert pending.get("also_reported_by") is None
+
+        web_app._rss_queue.push(queued)
+        web_app._pending_news["n1"] = queued
+        late = {"title": text + " tonight", "url": "https://c/1", "source_name": "BBC News"}
+        assert web_app._cluster_articles([late], seen=seen) == []
+        web_app._cluster_articles([late], seen=seen)      # re-seen copy isn't recorded twice
+
+        restored = NewsQueue(web_app._rss_queue.path).pop()
+        assert [r["url"] for r in restored["also_reported_by"]] == ["https://b/1", "https://c/1"]
+        assert web_app._pending_news.get("n1")["also_reported_by"] == restored["also_reported_by"]
+        expires = seen._conn().execute("SELECT expires - added FROM seen").fetchone()[0]
+        assert expires == pytest.approx(3600)
+
+
+# ===========================================================================
+# news_queue.py — scored RSS queue
+# ===========================================================================
+class TestNewsQueue:
+    """Tests for the persistent priority queue."""
+
+    def test_scores_order_expire_and_persist(self, tmp_path):
+        """Fresh / heavier items go first, stale ones expire, and the queue survives a reload."""
+        from news_queue import NewsQueue
+        path = tmp_path / "q.json"
+        q = NewsQueue(path, ttl_h=12, half_life_h=3)
+        now = 1_000_000.0
+        q.push({"title": "old", "published": now - 6 * 3600}, weight=2.0, now=now)     # 2 × ¼ = 0.5
+        q.push({"title": "fresh", "published": now - 600}, weight=1.0, now=now)
+        q.push({"title": "stale", "published": now - 13 * 3600}, weight=5.0, now=now)
+        q.push({"title": "heavy", "published": now - 600}, weight=1.5, now=now)
+
+        assert [i["title"] for i in q.snapshot(now)] == ["heavy", "fresh", "old", "stale"]
+        assert q.pop(now)["title"] == "heavy"
+        assert q.stats()["expired"] == 1                   # "stale" is past the TTL
+
+        restored = NewsQueue(path, ttl_h=12, half_life_h=3)
+        assert len(restored) == 2
+        assert restored.pop(now)["title"] == "fresh"
+        assert restored.pop(now)["title"] == "old"
+        assert restored.pop(now) is None
+
+
+# ===========================================================================
+# speculation.py — precompute for pending news
+# ===========================================================================
+class TestSpeculator:
+    """Tests for speculative card / caption precompute."""
+
+    def test_take_join_discard_and_llm_budget(self):
+        """Finished and in-flight work is reused; rejected work is cleaned up; LLM budget is enforced."""
+        import asyncio
+        from speculation import Speculator
+
+        async def scenario():
+            cleaned = []
+            spec = Speculator(max_concurrent=1, llm_per_hour=1, cleanup=cleaned.append)
+
+            async def prepare(name, allow_llm):
+                await asyncio.sleep(0.01)
+                return {"card_path": name, "caption": "draft" if allow_llm() else None}
+
+            assert spec.start("a", lambda allow: prepare("a", allow))
+            assert not spec.start("a", lambda allow: prepare("a", allow))     # already running
+            spec.start("b", lambda allow: prepare("b", allow))
+            spec.start("c", lambda allow: prepare("c", allow))
+            assert (await spec.take("a"))["caption"] == "draft"               # joined in flight
+            await asyncio.sleep(0.05)
+            assert (await spec.take("b"))["caption"] is None                  # budget spent
+            spec.discard("c")
+            assert cleaned == [{"card_path": "c", "caption": None}]
+            assert await spec.take("missing") is None
+            return spec.stats()
+
+        stats = asyncio.run(scenario())
+        assert stats["joined"] == 1 and stats["hits"] == 1 and stats["discarded"] == 1
+        assert stats["llm_denied"] == 2 and stats["misses"] == 1
+
+    def test_restart_clears_leftovers_and_rehydrates_newest(self, monkeypatch, tmp_path):
+        """Orphaned speculative cards are removed; only the newest max_entries items are re-primed."""
+        import asyncio
+        import web_app
+        from speculation import Speculator
+        spec_dir = tmp_path / "speculative"
+        spec_dir.mkdir()
+        (spec_dir / "orphan_news.jpg").write_bytes(b"x")
+        monkeypatch.setattr(web_app, "SPECULATIVE", spec_dir)
+        for i in range(4):
+            web_app._pending_news[f"n{i}"] = {"title": f"t{i}", "url": f"https://x/{i}"}
+            time.sleep(0.002)
+
+        async def fake_prepare(art, allow_llm=None):
+            return {"card_path": str(spec_dir / "p.jpg"), "display_title": art["title"], "caption": None}
+
+        async def stop():
+            raise asyncio.CancelledError
+
+        async def scenario():
+            spec = Speculator(max_entries=2, cleanup=web_app._discard_prepared)
+            monkeypatch.setattr(web_app, "_speculator", spec)
+            with pytest.raises(asyncio.CancelledError):
+                await web_app._pending_sweep_loop()
+            return spec
+
+        monkeypatch.setattr(web_app, "_prepare_news_post", fake_prepare)
+        monkeypatch.setattr(web_app, "_sweep_pending_news", stop)
+        spec = asyncio.run(scenario())
+        assert list(spec_dir.iterdir()) == []
+        assert sorted(spec._jobs) == ["https://x/2", "https://x/3"]
+        assert spec.stats()["evicted"] == 0
+
+
+# ===========================================================================
+# news_parser.py — interpressnews extraction
+# ===========================================================================
+class TestNewsParser:
+    """Tests for the streaming interpressnews parsers."""
+
+    def test_category_and_article_extraction(self):
+        """Article blocks yield title/url/image/time; article text keeps long paragraphs only."""
+        from news_parser import parse_article_text, parse_category, strip_tags
+        html = (
+            '<nav><h2 itemprop="name">menu</h2></nav>'
+            '<div itemscope itemtype="http://schema.org/Article"><div class="img">'
+            '<a itemprop="url" href="/ka/article/1-x/"><img itemprop="image" data-src="https://i/1.jpg" src="b.gif"></a>'
+            '</div><h2 itemprop="name"> <a href="#">პირველი</a> სიახლე </h2><time datetime="2024-05-01T10:00">10:00</time></div>'
+            '<div itemscope itemtype="http://schema.org/Article"><a itemprop="url" href="/ka/article/2/"></a></div>'
+            '<div itemscope itemtype="http://schema.org/Article"><a itemprop="url" href="https://ipn.ge/3">'
+            '<h2 itemprop="name">მესამე</h2></a></div>'
+        )
+        assert parse_category(html) == [
+            {"title": "პირველისიახლე", "url": "https://interpressnews.ge/ka/article/1-x/",
+             "image_url": "https://i/1.jpg", "time": "2024-05-01T10:00"},
+            {"title": "მესამე", "url": "https://ipn.ge/3", "image_url": None, "time": ""},
+        ]
+
+        page = ("<p>short</p><p>A long enough <b>first</b> paragraph &amp; more"
+                "<script>var x = 'not text';</script></p><div><p>Second paragraph without a closing tag</div>")
+        assert parse_article_text(page) == ("A long enoughfirstparagraph & more\n"
+                                            "Second paragraph without a closing tag")
+        assert strip_tags("<b>Breaking:</b> <i>news</i>") == "Breaking:news"
+
+    def test_main_content_and_article_cache_revalidation(self, etag_server):
+        """Sidebar / footer paragraphs are dropped; cached bodies are revalidated with a conditional GET."""
+        from article_cache import ArticleCache
+        from news_parser import extract_main_text
+
+        body = "".join(f"<p>Paragraph {i} of the story, with commas, details and quotes.</p>" for i in range(4))
+        page = (f'<body><div class="sidebar"><p><a href="/1">A related headline that is long enough</a></p></div>'
+                f'<div class="article-body">{body}</div>'
+                f'<footer><p>© 2024 Interpressnews. All rights reserved.</p></footer></body>').encode()
+        text = extract_main_text(page.decode())
+        assert text.splitlines() == [f"Paragraph {i} of the story, with commas, details and quotes."
+                                     for i in range(4)]
+
+        base, seen = etag_server(page, '"a1"')
+        url = f"{base}/ka/article/1/?utm_source=fb"
+        cache = ArticleCache(fresh_s=60)
+        assert cache.text(url) == text
+        assert cache.text(url.split("?")[0]) == text          # same canonical URL, no request
+        cache.fresh_s = 0
+        assert cache.text(url) == text                        # stale → 304
+        assert seen == [None, '"a1"']
+        assert cache.stats() == {"hits": 1, "revalidated": 1, "fetched": 1, "errors": 0,
+                                 "stale_served": 0, "entries": 1}
+
+
+# ===========================================================================
+# pending_store.py — persistent pending approvals
+# ===========================================================================
+class TestPendingStore:
+    """Tests for the SQLite-backed, TTL- and size-bounded pending-approval store."""
+
+    def test_persists_expires_and_caps(self, tmp_path):
+        """Items survive a restart, pop once, and over-capacity items expire with their message ids."""
+        from pending_store import PendingStore
+        path = tmp_path / "pending.db"
+        store = PendingStore(path, ttl_h=1, max_items=2)
+        store["a"] = {"title": "ა", "url": "https://x/a"}
+        store.set_message("a", 42, 1001, "photo")
+
+        restored = PendingStore(path, ttl_h=1, max_items=2)     # survives a restart
+        assert "a" in restored and len(restored) == 1
+        assert restored.pop("a")["title"] == "ა"
+        assert restored.pop("a") is None                        # approve/reject only once
+
+        restored["b"] = {"title": "b"}
+        restored.set_message("b", 42, 1002, "text")
+        time.sleep(0.01)
+        restored["c"] = {"title": "c"}
+        time.sleep(0.01)
+        restored["d"] = {"title": "d"}                          # over max_items → "b" expires
+        assert [a["title"] for a in restored.values()] == ["c", "d"]
+        assert restored.get("b") is None
+        expired = restored.take_expired()
+        assert [(e["id"], e["chat_id"], e["message_id"], e["kind"]) for e in expired] == \
+            [("b", "42", 1002, "text")]
+        assert restored.take_expired() == []
+        assert restored.stats()["pending"] == 2
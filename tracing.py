@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Span tracing for multi-stage request pipelines (e.g. /api/auto-generate).
+
+A Trace has an id and a list of spans; each span records its offset from the
+start of the trace, duration, outcome and (optionally) bytes handled.
+Finished traces go into a bounded ring buffer served by GET /api/traces, and
+every span duration is also observed in the `trace_span_seconds` histogram
+on /metrics.
+
+Usage:
+    from tracing import Trace
+    trace = Trace("auto_generate", theme="...")
+    with trace.span("search") as sp:
+        res = await asyncio.to_thread(search_tavily, theme)
+        sp.bytes = len(json.dumps(res))
+        if "error" in res:
+            sp.outcome = "error"
+    trace.finish("ok")
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from metrics import histogram
+
+RING_SIZE = 200
+
+SPAN_SECONDS = histogram("trace_span_seconds", "Duration of traced pipeline stages",
+                         ["trace", "span", "outcome"])
+
+_lock = threading.Lock()
+_finished: deque = deque(maxlen=RING_SIZE)
+
+
+class Span:
+    __slots__ = ("name", "start_ms", "duration_ms", "outcome", "bytes", "attrs")
+
+    def __init__(self, name: str, start_ms: float, attrs: dict):
+        self.name = name
+        self.start_ms = start_ms
+        self.duration_ms: Optional[float] = None
+        self.outcome = "ok"
+        self.bytes: Optional[int] = None
+        self.attrs = attrs
+
+    def to_dict(self) -> dict:
+        d = {"name": self.name, "start_ms": self.start_ms, "duration_ms": self.duration_ms,
+             "outcome": self.outcome}
+        if self.bytes is not None:
+            d["bytes"] = self.bytes
+        if self.attrs:
+            d["attrs"] = self.attrs
+        return d
+
+
+class Trace:
+    """One traced request. Not thread-safe — spans are opened from the request's own task."""
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attrs = attrs
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: list[Span] = []
+        self.status: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+
+    def _now_ms(self) -> float:
+        return round((time.perf_counter() - self._t0) * 1000, 1)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a stage. An escaping exception marks the span as "error"."""
+        sp = Span(name, self._now_ms(), attrs)
+        self.spans.append(sp)
+        t0 = time.perf_counter()
+        try:
+            yield sp
+        except BaseException:
+            sp.outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            sp.duration_ms = round(elapsed * 1000, 1)
+            SPAN_SECONDS.observe(elapsed, trace=self.name, span=name, outcome=sp.outcome)
+
+    def stage_ms(self) -> dict[str, float]:
+        """{span name: total ms} — repeated spans (e.g. several downloads) are summed."""
+        out: dict[str, float] = {}
+        for sp in self.spans:
+            if sp.duration_ms is not None:
+                out[sp.name] = round(out.get(sp.name, 0.0) + sp.duration_ms, 1)
+        return out
+
+    def finish(self, status: str = "ok"):
+        """Close the trace and push it into the ring buffer (idempotent)."""
+        if self.status is not None:
+            return
+        self.status = status
+        self.duration_ms = self._now_ms()
+        with _lock:
+            _finished.append(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "spans": [sp.to_dict() for sp in self.spans],
+        }
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))
+    return values[k]
+
+
+def recent_traces(name: Optional[str] = None, limit: int = 50) -> list[dict]:
+    """Newest-first finished traces, optionally filtered by trace name."""
+    with _lock:
+        traces = list(_finished)
+    traces = [t for t in reversed(traces) if name is None or t.name == name]
+    return [t.to_dict() for t in traces[:max(1, min(int(limit), RING_SIZE))]]
+
+
+def stage_summary(name: Optional[str] = None) -> dict:
+    """Per-stage count / p50 / p95 / max (ms) over the ring buffer — which stage dominates."""
+    with _lock:
+        traces = [t for t in _finished if name is None or t.name == name]
+    per_stage: dict[str, list[float]] = {}
+    totals = []
+    for t in traces:
+        totals.append(t.duration_ms)
+        for stage, ms in t.stage_ms().items():
+            per_stage.setdefault(stage, []).append(ms)
+    summary = {
+        stage: {"count": len(v), "p50_ms": _percentile(v, 50), "p95_ms": _percentile(v, 95),
+                "max_ms": max(v)}
+        for stage, v in per_stage.items()
+    }
+    if totals:
+        summary["_total"] = {"count": len(totals), "p50_ms": _percentile(totals, 50),
+                             "p95_ms": _percentile(totals, 95), "max_ms": max(totals)}
+    return summary